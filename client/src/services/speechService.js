@@ -28,13 +28,10 @@ class SpeechService {
   // Convert speech to text using the API
   async recognizeSpeech(audioBlob, language = 'en-US') {
     try {
-      // Convert blob to base64
-      const base64Audio = await this.blobToBase64(audioBlob);
-      
-      const response = await axios.post(`${this.apiUrl}/recognize`, {
-        audio_data: base64Audio,
-        content_type: audioBlob.type || 'audio/wav',
-        language
+      // Send the recording as the raw request body; no base64 inflation
+      const response = await axios.post(`${this.apiUrl}/recognize`, audioBlob, {
+        params: { language },
+        headers: { 'Content-Type': audioBlob.type || 'audio/wav' }
       });
       
       return response.data;
@@ -47,26 +44,24 @@ class SpeechService {
   // Convert text to speech using the API
   async synthesizeSpeech(text, options = {}) {
     try {
+      // The server returns the WAV file itself when asked for audio
       const response = await axios.post(`${this.apiUrl}/synthesize`, {
         text,
         rate: options.rate || 175,
         volume: options.volume || 1.0
+      }, {
+        headers: { Accept: 'audio/wav' },
+        responseType: 'blob'
       });
       
-      if (response.data.success) {
-        // Convert base64 to audio
-        const audioData = this.base64ToArrayBuffer(response.data.audio_data);
-        const audioBlob = new Blob([audioData], { type: response.data.content_type || 'audio/wav' });
-        const audioUrl = URL.createObjectURL(audioBlob);
-        
-        return {
-          success: true,
-          audioUrl,
-          audioBlob
-        };
-      } else {
-        throw new Error(response.data.error || 'Failed to synthesize speech');
-      }
+      const audioBlob = response.data;
+      const audioUrl = URL.createObjectURL(audioBlob);
+      
+      return {
+        success: true,
+        audioUrl,
+        audioBlob
+      };
     } catch (error) {
       console.error('Speech synthesis error:', error);
       throw error;
@@ -1,9 +1,28 @@
 import os
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
 import json
+import itertools
+import threading
+import uuid
+import secrets
 from functools import wraps
+from journal_search import JournalSearchIndex
+from journal_stats import JournalStats
+from journal_file import load_journal, save_journal
+from emotion_tagger import EmotionTagger, EMOTION_LABELS, entry_text, get_sentiment_model, score_texts, warm_sentiment_model
+from chat_sessions import ChatSessionStore
+from response_engine import ResponseEngine, CRISIS_RESPONSE_TEXT
+from crisis_detector import CrisisDetector, DEFAULT_PHRASE_FILE
+from resource_catalog import ResourceCatalog, PreparedResponse, SAMPLE_RESOURCES
+from auth_tokens import TokenVerifier
+from password_hasher import PasswordHasher, HasherBusyError
+from metrics import MetricsRegistry, instrument_app
+from profiler import SamplingProfiler, instrument_profiler
+from json_provider import get_json_provider_class, list_response
+from pagination import SortedKeyIndex, InvalidCursorError, encode_cursor, decode_cursor, parse_fields, parse_limit, project
+import jwt
 
 # Load environment variables
 load_dotenv()
@@ -12,41 +31,134 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)
 
+# Encode responses with orjson when available (JSON_PROVIDER=stdlib forces the stdlib encoder)
+app.json_provider_class = get_json_provider_class(os.getenv('JSON_PROVIDER'))
+app.json = app.json_provider_class(app)
+
+# Per-route latency, request/error counts and stage timings, served at /metrics
+metrics = instrument_app(app, MetricsRegistry('companion'))
+
+# Opt-in sampling profiler; disabled unless PROFILE_SAMPLE_RATE or PROFILE_TOKEN is set
+instrument_profiler(
+    app,
+    SamplingProfiler(interval=float(os.getenv('PROFILE_INTERVAL', 0.005))),
+    sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', 0)),
+    token=os.getenv('PROFILE_TOKEN')
+)
+
 # Create a mock controller for demonstration
 class MockChatController:
-    def processMessage(self, message):
-        return {
+    def __init__(self, sessions, responses):
+        self.sessions = sessions
+        self.responses = responses
+    
+    def processMessage(self, message, sessionId=None):
+        # Only the new message is scored; earlier turns live on in the session's decayed scores
+        scored = score_texts(get_sentiment_model(), [message])[0]
+        emotion = scored['emotion'] or 'neutral'
+        confidence = scored['probability'] if scored['emotion'] else 0.8
+        
+        context = None
+        if sessionId:
+            context = self.sessions.record(sessionId, emotion, scored['scores'])
+        
+        # Rotate through the reply variants as the conversation goes on
+        text, resources = self.responses.render(emotion, confidence, context['turns'] if context else 0)
+        result = {
             'success': True,
             'response': {
-                'text': f"This is a mock response to: '{message}'",
-                'detectedEmotion': 'neutral',
-                'confidence': 0.8
-            }
+                'text': text,
+                'detectedEmotion': emotion,
+                'confidence': confidence
+            },
+            'resources': resources
         }
+        if sessionId:
+            result['sessionId'] = sessionId
+            result['context'] = context
+        return result
+
+# Fields kept as strings; the sort indexes, search index and stats rely on it
+MOOD_TEXT_FIELDS = ('mood', 'notes', 'date')
+JOURNAL_TEXT_FIELDS = ('title', 'content', 'date', 'mood')
+RESOURCE_TEXT_FIELDS = ('title', 'description', 'url', 'type', 'phone')
+
+def invalid_text_field(data, fields):
+    """Return the first of fields that data sets to something other than a string, or None."""
+    for field in fields:
+        if field in data and not isinstance(data[field], str):
+            return field
+    return None
+
+def invalid_resource_message(data):
+    """Why resource data cannot be stored (the catalog indexes these fields), or None if it can."""
+    field = invalid_text_field(data, RESOURCE_TEXT_FIELDS)
+    if field:
+        return f'{field} must be a string'
+    if 'featured' in data and not isinstance(data['featured'], bool):
+        return 'featured must be true or false'
+    return None
 
 # Create mock models
 class MockUserModel:
+    def __init__(self, passwordHasher):
+        # In-memory credential store; passwords are only ever kept as bcrypt hashes
+        self.passwordHasher = passwordHasher
+        self.usersByEmail = {}
+        self.usersById = {}
+        self.lock = threading.RLock()
+    
     def createUser(self, data):
+        email = data.get('email', '').strip().lower()
+        if email in self.usersByEmail:
+            return {
+                'success': False,
+                'message': 'User already exists'
+            }
+        
+        # Hashing runs on the pool without the lock; the email is checked again before the insert
+        passwordHash = self.passwordHasher.hash(data.get('password', ''))
+        with self.lock:
+            if email in self.usersByEmail:
+                return {
+                    'success': False,
+                    'message': 'User already exists'
+                }
+            user = {
+                'id': str(uuid.uuid4()),
+                'name': data.get('name', ''),
+                'email': email,
+                'passwordHash': passwordHash
+            }
+            self.usersByEmail[email] = user
+            self.usersById[user['id']] = user
         return {
             'success': True,
             'message': 'User created successfully',
             'user': {
-                'id': 'mock-id',
-                'name': data.get('name', ''),
-                'email': data.get('email', '')
+                'id': user['id'],
+                'name': user['name'],
+                'email': user['email']
             }
         }
     
     def authenticateUser(self, email, password):
+        user = self.usersByEmail.get(email.strip().lower())
+        # Always run a bcrypt check so unknown emails take as long as wrong passwords
+        if not self.passwordHasher.verify(password, user['passwordHash'] if user else None):
+            return {
+                'success': False,
+                'message': 'Invalid email or password'
+            }
         return {
             'success': True,
             'message': 'Login successful',
             'user': {
-                'id': 'mock-id',
-                'name': 'Test User',
-                'email': email
+                'id': user['id'],
+                'name': user['name'],
+                'email': user['email']
             },
-            'token': 'mock-token'
+            'token': tokenVerifier.issue(user['id'])
         }
     
     def getUserById(self, userId):
@@ -79,6 +191,13 @@ class MockUserModel:
         }
     
     def changePassword(self, userId, currentPassword, newPassword):
+        user = self.usersById.get(userId)
+        if not self.passwordHasher.verify(currentPassword, user['passwordHash'] if user else None):
+            return {
+                'success': False,
+                'message': 'Current password is incorrect'
+            }
+        user['passwordHash'] = self.passwordHasher.hash(newPassword)
         return {
             'success': True,
             'message': 'Password changed successfully'
@@ -98,29 +217,54 @@ class MockUserModel:
         }
 
 class MockMoodModel:
-    def getUserMoods(self, userId):
+    def __init__(self):
+        # In-memory mood store keyed by user, seeded with sample moods
+        self.moods = {}
+        self.order = {}
+        self.clientIds = {}
+        self.nextId = itertools.count(4)
+        self.lock = threading.RLock()
+    
+    def _getUserStore(self, userId):
+        with self.lock:
+            store = self.moods.get(userId)
+            if store is None:
+                store = self.moods[userId] = {}
+                order = self.order[userId] = SortedKeyIndex()
+                for mood in [
+                    {
+                        'id': '1',
+                        'mood': 'Happy',
+                        'notes': 'Had a great day!',
+                        'date': '2023-05-15T10:30:00'
+                    },
+                    {
+                        'id': '2',
+                        'mood': 'Anxious',
+                        'notes': 'Feeling stressed about work',
+                        'date': '2023-05-14T18:45:00'
+                    },
+                    {
+                        'id': '3',
+                        'mood': 'Calm',
+                        'notes': 'Meditation helped today',
+                        'date': '2023-05-13T08:20:00'
+                    }
+                ]:
+                    store[mood['id']] = mood
+                    order.add((mood['date'], mood['id']))
+            return store
+    
+    def getUserMoods(self, userId, limit=None, cursor=None, fields=None):
+        store = self._getUserStore(userId)
+        after = decode_cursor(cursor) if cursor else None
+        with self.lock:
+            keys, nextKey = self.order[userId].page(limit, after)
+            moods = [project(store[moodId], fields) for date, moodId in keys]
         return {
             'success': True,
-            'moods': [
-                {
-                    'id': '1',
-                    'mood': 'Happy',
-                    'notes': 'Had a great day!',
-                    'date': '2023-05-15T10:30:00'
-                },
-                {
-                    'id': '2',
-                    'mood': 'Anxious',
-                    'notes': 'Feeling stressed about work',
-                    'date': '2023-05-14T18:45:00'
-                },
-                {
-                    'id': '3',
-                    'mood': 'Calm',
-                    'notes': 'Meditation helped today',
-                    'date': '2023-05-13T08:20:00'
-                }
-            ]
+            'moods': moods,
+            'nextCursor': encode_cursor(nextKey) if nextKey else None
         }
     
     def getUserMoodsByDateRange(self, userId, startDate, endDate):
@@ -143,225 +287,517 @@ class MockMoodModel:
         }
     
     def addMood(self, userId, moodData):
+        field = invalid_text_field(moodData, MOOD_TEXT_FIELDS)
+        if field:
+            return {
+                'success': False,
+                'message': f'{field} must be a string'
+            }
+        store = self._getUserStore(userId)
+        mood = {
+            'id': str(next(self.nextId)),
+            'mood': moodData.get('mood', ''),
+            'notes': moodData.get('notes', ''),
+            'date': moodData.get('date', '')
+        }
+        with self.lock:
+            store[mood['id']] = mood
+            self.order[userId].add((mood['date'], mood['id']))
         return {
             'success': True,
             'message': 'Mood recorded successfully',
-            'mood': {
-                'id': '4',
-                'mood': moodData.get('mood', ''),
-                'notes': moodData.get('notes', ''),
-                'date': moodData.get('date', '')
-            }
+            'mood': mood
+        }
+    
+    def addMoods(self, userId, items):
+        # Validate every item, then write all valid ones in a single critical section.
+        # Validation checks every field the writes index, so the write phase cannot fail partway.
+        # Items carrying a clientId that was already imported are reported, not re-created.
+        store = self._getUserStore(userId)
+        results = []
+        created = []
+        with self.lock:
+            clientIds = self.clientIds.setdefault(userId, {})
+            batchIds = {}
+            for index, item in enumerate(items):
+                if not isinstance(item, dict):
+                    results.append({'index': index, 'status': 'invalid', 'message': 'Each mood must be a JSON object'})
+                    continue
+                if not item.get('mood'):
+                    results.append({'index': index, 'status': 'invalid', 'message': 'Mood is required'})
+                    continue
+                field = invalid_text_field(item, MOOD_TEXT_FIELDS)
+                if field:
+                    results.append({'index': index, 'status': 'invalid', 'message': f'{field} must be a string'})
+                    continue
+                
+                clientId = item.get('clientId')
+                if clientId is not None:
+                    clientId = str(clientId)
+                    existingId = clientIds.get(clientId) or batchIds.get(clientId)
+                    if existingId:
+                        results.append({'index': index, 'status': 'duplicate', 'id': existingId, 'clientId': clientId})
+                        continue
+                
+                mood = {
+                    'id': str(next(self.nextId)),
+                    'mood': item.get('mood'),
+                    'notes': item.get('notes', ''),
+                    'date': item.get('date', '')
+                }
+                if clientId is not None:
+                    batchIds[clientId] = mood['id']
+                created.append(mood)
+                results.append({'index': index, 'status': 'created', 'id': mood['id'], 'clientId': clientId})
+            
+            for mood in created:
+                store[mood['id']] = mood
+                self.order[userId].add((mood['date'], mood['id']))
+            clientIds.update(batchIds)
+        
+        return {
+            'success': True,
+            'created': len(created),
+            'duplicates': sum(1 for r in results if r['status'] == 'duplicate'),
+            'invalid': sum(1 for r in results if r['status'] == 'invalid'),
+            'results': results
         }
     
     def updateMood(self, userId, moodId, moodData):
+        # Checked before the mood leaves the sort index, so a bad date cannot drop it from listings
+        field = invalid_text_field(moodData, MOOD_TEXT_FIELDS)
+        if field:
+            return {
+                'success': False,
+                'message': f'{field} must be a string'
+            }
+        store = self._getUserStore(userId)
+        with self.lock:
+            mood = store.get(moodId)
+            if mood is None:
+                return {
+                    'success': False,
+                    'message': 'Mood entry not found'
+                }
+            previousDate = mood['date']
+            for field in MOOD_TEXT_FIELDS:
+                if field in moodData:
+                    mood[field] = moodData[field]
+            if mood['date'] != previousDate:
+                self.order[userId].remove((previousDate, moodId))
+                self.order[userId].add((mood['date'], moodId))
         return {
             'success': True,
             'message': 'Mood updated successfully',
-            'mood': {
-                'id': moodId,
-                'mood': moodData.get('mood', ''),
-                'notes': moodData.get('notes', ''),
-                'date': moodData.get('date', '')
-            }
+            'mood': mood
         }
     
     def deleteMood(self, userId, moodId):
+        store = self._getUserStore(userId)
+        with self.lock:
+            mood = store.pop(moodId, None)
+            if mood is None:
+                return {
+                    'success': False,
+                    'message': 'Mood entry not found'
+                }
+            self.order[userId].remove((mood['date'], moodId))
         return {
             'success': True,
             'message': 'Mood entry deleted successfully'
         }
 
 class MockJournalModel:
-    def getUserEntries(self, userId):
+    def __init__(self, dataFile=None):
+        # In-memory entry store keyed by user, seeded with sample entries.
+        # With a dataFile ({userId: [entries]}) the journal is loaded from it and written back on every change.
+        self.entries = {}
+        self.nextId = itertools.count(3)
+        self.searchIndex = JournalSearchIndex()
+        self.stats = JournalStats()
+        self.emotionTagger = EmotionTagger(self._applyEmotion)
+        self.order = {}
+        self.lock = threading.RLock()
+        self.dataFile = dataFile
+        if dataFile:
+            self._load(dataFile)
+    
+    def _index(self, userId, entry):
+        # Called with self.lock held
+        self.entries[userId][entry['id']] = entry
+        self.order[userId].add((entry['date'], entry['id']))
+        self.searchIndex.add(userId, entry['id'], entry['title'], entry['content'])
+        self.stats.add(userId, entry)
+    
+    def _load(self, path):
+        lastId = 2
+        with self.lock:
+            for userId, entries in load_journal(path).items():
+                self.entries[userId] = {}
+                self.order[userId] = SortedKeyIndex()
+                for entry in entries:
+                    entry['id'] = str(entry['id'])
+                    for field in JOURNAL_TEXT_FIELDS:
+                        if not isinstance(entry.get(field), str):
+                            entry[field] = ''
+                    self._index(userId, entry)
+                    if entry['id'].isdigit():
+                        lastId = max(lastId, int(entry['id']))
+                    # Entries saved before tagging existed are tagged in the background now
+                    if not entry.get('emotion'):
+                        self.emotionTagger.enqueue(userId, entry)
+            self.nextId = itertools.count(lastId + 1)
+    
+    def _save(self):
+        # Called with self.lock held after every change
+        if self.dataFile:
+            save_journal(self.dataFile, {userId: list(store.values()) for userId, store in self.entries.items()})
+    
+    def _getUserStore(self, userId):
+        with self.lock:
+            store = self.entries.get(userId)
+            if store is None:
+                store = self.entries[userId] = {}
+                self.order[userId] = SortedKeyIndex()
+                for entry in [
+                    {
+                        'id': '1',
+                        'title': 'First day of therapy',
+                        'content': 'Had my first therapy session today. It went really well...',
+                        'date': '2023-05-10T14:30:00'
+                    },
+                    {
+                        'id': '2',
+                        'title': 'Trying meditation',
+                        'content': 'Started a daily meditation practice today...',
+                        'date': '2023-05-12T20:15:00'
+                    }
+                ]:
+                    self._index(userId, entry)
+                    self.emotionTagger.enqueue(userId, entry)
+                self._save()
+            return store
+    
+    def _applyEmotion(self, userId, entryId, text, result):
+        # Called from the tagging worker; ignore results for edited or deleted entries
+        with self.lock:
+            entry = self.entries.get(userId, {}).get(entryId)
+            if entry is None or entry_text(entry) != text or result['emotion'] is None:
+                return
+            previous = dict(entry)
+            entry['emotion'] = result['emotion']
+            entry['emotionScores'] = result['scores']
+            self.stats.update(userId, previous, entry)
+            self._save()
+    
+    def getUserEntries(self, userId, limit=None, cursor=None, fields=None):
+        store = self._getUserStore(userId)
+        after = decode_cursor(cursor) if cursor else None
+        with self.lock:
+            keys, nextKey = self.order[userId].page(limit, after)
+            entries = [project(store[entryId], fields) for date, entryId in keys]
         return {
             'success': True,
-            'entries': [
-                {
-                    'id': '1',
-                    'title': 'First day of therapy',
-                    'content': 'Had my first therapy session today. It went really well...',
-                    'date': '2023-05-10T14:30:00'
-                },
-                {
-                    'id': '2',
-                    'title': 'Trying meditation',
-                    'content': 'Started a daily meditation practice today...',
-                    'date': '2023-05-12T20:15:00'
-                }
-            ]
+            'entries': entries,
+            'nextCursor': encode_cursor(nextKey) if nextKey else None
         }
     
     def searchEntries(self, userId, searchTerm):
-        return self.getUserEntries(userId)
+        store = self._getUserStore(userId)
+        matches = self.searchIndex.search(userId, searchTerm)
+        return {
+            'success': True,
+            'entries': [store[entryId] for entryId, score in matches if entryId in store]
+        }
     
     def getUserEntriesByDateRange(self, userId, startDate, endDate):
         return self.getUserEntries(userId)
     
     def getEntry(self, userId, entryId):
+        entry = self._getUserStore(userId).get(entryId)
+        if entry is None:
+            return {
+                'success': False,
+                'message': 'Journal entry not found'
+            }
         return {
             'success': True,
-            'entry': {
-                'id': entryId,
-                'title': 'Sample Journal Entry',
-                'content': 'This is a sample journal entry content...',
-                'date': '2023-05-10T14:30:00'
-            }
+            'entry': entry
         }
     
     def getUserJournalStats(self, userId):
+        self._getUserStore(userId)
         return {
             'success': True,
-            'stats': {
-                'totalEntries': 10,
-                'averageLength': 250,
-                'mostFrequentMood': 'Happy',
-                'monthlyActivity': {
-                    '2023-05': 5,
-                    '2023-04': 3,
-                    '2023-03': 2
-                },
-                'wordFrequency': {
-                    'meditation': 15,
-                    'therapy': 10,
-                    'exercise': 8
-                }
-            }
+            'stats': self.stats.get(userId)
         }
     
     def addEntry(self, userId, entryData):
+        # Checked before anything is stored: the indexes and stats only take text
+        field = invalid_text_field(entryData, JOURNAL_TEXT_FIELDS)
+        if field:
+            return {
+                'success': False,
+                'message': f'{field} must be a string'
+            }
+        self._getUserStore(userId)
+        entry = {
+            'id': str(next(self.nextId)),
+            'title': entryData.get('title', ''),
+            'content': entryData.get('content', ''),
+            'date': entryData.get('date', ''),
+            'mood': entryData.get('mood', '')
+        }
+        with self.lock:
+            self._index(userId, entry)
+            self._save()
+        self.emotionTagger.enqueue(userId, entry)
         return {
             'success': True,
             'message': 'Journal entry created successfully',
-            'entry': {
-                'id': '3',
-                'title': entryData.get('title', ''),
-                'content': entryData.get('content', ''),
-                'date': entryData.get('date', '')
-            }
+            'entry': entry
         }
     
     def updateEntry(self, userId, entryId, entryData):
+        field = invalid_text_field(entryData, JOURNAL_TEXT_FIELDS)
+        if field:
+            return {
+                'success': False,
+                'message': f'{field} must be a string'
+            }
+        store = self._getUserStore(userId)
+        with self.lock:
+            entry = store.get(entryId)
+            if entry is None:
+                return {
+                    'success': False,
+                    'message': 'Journal entry not found'
+                }
+            previous = dict(entry)
+            for field in JOURNAL_TEXT_FIELDS:
+                if field in entryData:
+                    entry[field] = entryData[field]
+            if entry['date'] != previous['date']:
+                self.order[userId].remove((previous['date'], entryId))
+                self.order[userId].add((entry['date'], entryId))
+            self.searchIndex.update(userId, entryId, entry['title'], entry['content'])
+            self.stats.update(userId, previous, entry)
+            self._save()
+        if entry_text(entry) != entry_text(previous):
+            self.emotionTagger.enqueue(userId, entry)
         return {
             'success': True,
             'message': 'Journal entry updated successfully',
-            'entry': {
-                'id': entryId,
-                'title': entryData.get('title', ''),
-                'content': entryData.get('content', ''),
-                'date': entryData.get('date', '')
-            }
+            'entry': entry
         }
     
     def deleteEntry(self, userId, entryId):
+        store = self._getUserStore(userId)
+        with self.lock:
+            entry = store.pop(entryId, None)
+            if entry is None:
+                return {
+                    'success': False,
+                    'message': 'Journal entry not found'
+                }
+            self.order[userId].remove((entry['date'], entryId))
+            self.searchIndex.remove(userId, entryId)
+            self.stats.remove(userId, entry)
+            self._save()
         return {
             'success': True,
             'message': 'Journal entry deleted successfully'
         }
 
 class MockResourceModel:
-    def getAllResources(self):
-        return {
-            'success': True,
-            'resources': [
-                {
-                    'id': '1',
-                    'title': 'Understanding Anxiety',
-                    'description': 'Learn about the causes and symptoms of anxiety disorders.',
-                    'url': 'https://example.com/anxiety',
-                    'type': 'article'
-                },
-                {
-                    'id': '2',
-                    'title': '10-Minute Meditation',
-                    'description': 'A guided meditation for beginners.',
-                    'url': 'https://example.com/meditation',
-                    'type': 'meditation'
-                },
-                {
-                    'id': '3',
-                    'title': 'Stress Relief Techniques',
-                    'description': 'Simple exercises to reduce stress.',
-                    'url': 'https://example.com/stress-relief',
-                    'type': 'exercise'
-                }
-            ]
-        }
+    def __init__(self):
+        # In-memory resource store, seeded with sample resources
+        self.resources = {}
+        self.nextId = itertools.count(6)
+        self.lock = threading.RLock()
+        self.catalog = ResourceCatalog(self._snapshot)
+        for resource in SAMPLE_RESOURCES:
+            self.resources[resource['id']] = dict(resource)
+        # Crisis resources are served pre-serialized so the route does no work
+        self.crisisResponse = PreparedResponse(self.getCrisisResources)
+    
+    def _snapshot(self):
+        # Copies, so the catalog never indexes a resource while a write is changing it
+        with self.lock:
+            return [dict(r) for r in self.resources.values()]
+    
+    def _resourcesChanged(self):
+        self.catalog.invalidate()
+        self.crisisResponse.refresh()
+    
+    def getAllResources(self, limit=None, cursor=None, fields=None):
+        after = None
+        if cursor:
+            key = decode_cursor(cursor)
+            if len(key) != 1:
+                raise InvalidCursorError('Invalid cursor')
+            after = key[0]
+        page, etag = self.catalog.page(limit, after, fields)
+        return {'success': True, 'resources': page['resources'], 'nextCursor': page['nextCursor'], 'etag': etag}
     
     def getResourcesByType(self, type):
-        resources = self.getAllResources()
-        filtered = [r for r in resources['resources'] if r['type'] == type]
-        return {'success': True, 'resources': filtered}
+        resources, etag = self.catalog.by_type(type)
+        return {'success': True, 'resources': resources, 'etag': etag}
     
     def getFeaturedResources(self):
-        return self.getAllResources()
+        resources, etag = self.catalog.featured()
+        return {'success': True, 'resources': resources, 'etag': etag}
     
     def getCrisisResources(self):
+        with self.lock:
+            resources = [dict(r) for r in self.resources.values() if r.get('type') == 'crisis']
         return {
             'success': True,
-            'resources': [
-                {
-                    'id': '5',
-                    'title': 'Crisis Hotline',
-                    'description': '24/7 support for mental health crises',
-                    'url': 'https://example.com/crisis',
-                    'type': 'crisis',
-                    'phone': '1-800-273-8255'
-                }
-            ]
+            'resources': resources
         }
     
+    def getCrisisPayload(self):
+        return self.crisisResponse.get()
+    
     def searchResources(self, searchTerm):
-        return self.getAllResources()
+        resources, etag = self.catalog.search(searchTerm)
+        return {'success': True, 'resources': resources, 'etag': etag}
     
     def addResource(self, resourceData):
+        message = invalid_resource_message(resourceData)
+        if message:
+            return {
+                'success': False,
+                'message': message
+            }
+        resource = {
+            'id': str(next(self.nextId)),
+            'title': resourceData.get('title', ''),
+            'description': resourceData.get('description', ''),
+            'url': resourceData.get('url', ''),
+            'type': resourceData.get('type', ''),
+            'featured': bool(resourceData.get('featured', False))
+        }
+        if resource['type'] == 'crisis' and resourceData.get('phone'):
+            resource['phone'] = resourceData['phone']
+        with self.lock:
+            self.resources[resource['id']] = resource
+        self._resourcesChanged()
         return {
             'success': True,
             'message': 'Resource added successfully',
-            'resource': {
-                'id': '4',
-                'title': resourceData.get('title', ''),
-                'description': resourceData.get('description', ''),
-                'url': resourceData.get('url', ''),
-                'type': resourceData.get('type', '')
-            }
+            'resource': resource
         }
     
     def updateResource(self, resourceId, resourceData):
+        message = invalid_resource_message(resourceData)
+        if message:
+            return {
+                'success': False,
+                'message': message
+            }
+        with self.lock:
+            resource = self.resources.get(resourceId)
+            if resource is None:
+                return {
+                    'success': False,
+                    'message': 'Resource not found'
+                }
+            for field in RESOURCE_TEXT_FIELDS + ('featured',):
+                if field in resourceData:
+                    resource[field] = resourceData[field]
+            resource = dict(resource)
+        self._resourcesChanged()
         return {
             'success': True,
             'message': 'Resource updated successfully',
-            'resource': {
-                'id': resourceId,
-                'title': resourceData.get('title', ''),
-                'description': resourceData.get('description', ''),
-                'url': resourceData.get('url', ''),
-                'type': resourceData.get('type', '')
-            }
+            'resource': resource
         }
     
     def deleteResource(self, resourceId):
+        with self.lock:
+            removed = self.resources.pop(resourceId, None)
+        if removed is None:
+            return {
+                'success': False,
+                'message': 'Resource not found'
+            }
+        self._resourcesChanged()
         return {
             'success': True,
             'message': 'Resource deleted successfully'
         }
     
     def toggleFeatured(self, resourceId):
+        with self.lock:
+            resource = self.resources.get(resourceId)
+            if resource is None:
+                return {
+                    'success': False,
+                    'message': 'Resource not found'
+                }
+            featured = resource['featured'] = not resource.get('featured', False)
+        self._resourcesChanged()
         return {
             'success': True,
-            'message': 'Resource featured successfully',
+            'message': f"Resource {'featured' if featured else 'unfeatured'} successfully",
             'resource': {
                 'id': resourceId,
-                'featured': True
+                'featured': featured
             }
         }
 
+def jwt_secret():
+    """
+    The token signing key from JWT_SECRET. Without it anyone could forge tokens
+    with a well-known default, so startup fails; only development
+    (FLASK_ENV=development) falls back to a random key for this process.
+    """
+    secret = os.getenv('JWT_SECRET')
+    if secret:
+        return secret
+    if os.getenv('FLASK_ENV') != 'development':
+        raise RuntimeError('JWT_SECRET is not set; refusing to sign tokens with a default key')
+    print("JWT_SECRET is not set; using a random development key (tokens will not survive a restart)")
+    return secrets.token_urlsafe(32)
+
+# Token signing key is prepared once; decoded claims are cached per token
+tokenVerifier = TokenVerifier(jwt_secret())
+
+# bcrypt runs on its own bounded pool so login bursts cannot starve other routes
+passwordHasher = PasswordHasher(
+    rounds=int(os.getenv('BCRYPT_ROUNDS', 12)),
+    max_workers=int(os.getenv('BCRYPT_WORKERS', 2)),
+    max_pending=int(os.getenv('BCRYPT_MAX_PENDING', 32)),
+    per_client_limit=int(os.getenv('BCRYPT_PER_CLIENT_LIMIT', 2))
+)
+
 # Initialize mock controllers and models
-chatController = MockChatController()
-userModel = MockUserModel()
+crisisDetector = CrisisDetector(os.getenv('CRISIS_PHRASE_FILE', DEFAULT_PHRASE_FILE))
+userModel = MockUserModel(passwordHasher)
 moodModel = MockMoodModel()
-journalModel = MockJournalModel()
+journalModel = MockJournalModel(os.getenv('JOURNAL_DATA_FILE'))
 resourceModel = MockResourceModel()
+chatController = MockChatController(
+    ChatSessionStore(
+        EMOTION_LABELS,
+        ttl=int(os.getenv('CHAT_SESSION_TTL', 1800)),
+        max_sessions=int(os.getenv('CHAT_MAX_SESSIONS', 100000))
+    ),
+    ResponseEngine(EMOTION_LABELS, resourceModel.catalog)
+)
+
+# Load the classifier now so the first chat request does not pay for importing TensorFlow and downloading NLTK data
+warm_sentiment_model()
+
+metrics.callback_gauge('password_hash_queue_depth', 'Password hashing requests waiting for a worker',
+                       lambda: passwordHasher.metrics()['queue_depth'])
+metrics.callback_counter('password_hash_rejected_total', 'Password hashing requests rejected as over capacity',
+                         lambda: passwordHasher.metrics()['rejected'])
+metrics.callback_counter('password_hash_timeouts_total', 'Password hashing requests that gave up waiting for a worker',
+                         lambda: passwordHasher.metrics()['timed_out'])
+metrics.callback_gauge('emotion_tagging_queue_depth', 'Journal entries waiting for emotion tagging',
+                       journalModel.emotionTagger.pending)
 
 # JWT Authentication middleware
 def token_required(f):
@@ -370,8 +806,9 @@ def token_required(f):
         token = None
         
         # Check if token is in headers
-        if 'Authorization' in request.headers:
-            token = request.headers['Authorization'].split(' ')[1]
+        auth_header = request.headers.get('Authorization', '')
+        if auth_header.startswith('Bearer '):
+            token = auth_header[7:].strip()
         
         if not token:
             return jsonify({
@@ -380,22 +817,62 @@ def token_required(f):
             }), 401
         
         try:
-            # In a real app, verify token here
-            # For now, just assume it's valid and get user_id from it
-            user_id = 'mock-id'  # This would come from the token
-            
-            # Store user_id for the route function
-            request.user_id = user_id
-            
-            return f(*args, **kwargs)
-        except Exception as e:
+            claims = tokenVerifier.verify(token)
+        except jwt.ExpiredSignatureError:
+            return jsonify({
+                'success': False,
+                'message': 'Token has expired'
+            }), 401
+        except jwt.InvalidTokenError:
             return jsonify({
                 'success': False,
                 'message': 'Invalid token'
             }), 401
+        
+        # Store user_id for the route function
+        request.user_id = claims.get('id')
+        
+        return f(*args, **kwargs)
             
     return decorated
 
+def conditional_response(result):
+    """Build a JSON response that honours If-None-Match when the result carries an ETag"""
+    etag = result.pop('etag', None)
+    response = jsonify(result)
+    if etag:
+        response.set_etag(etag)
+        response.make_conditional(request)
+    return response
+
+# Largest batch accepted by bulk import endpoints
+MAX_BULK_ITEMS = 1000
+
+def read_bulk_items():
+    """
+    Read the items of a bulk request body, sent either as a JSON array or as
+    NDJSON (one JSON object per line). Unparseable NDJSON lines are kept as
+    None so they are reported as invalid at their position.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/ndjson'):
+        items = []
+        for line in request.stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                items.append(None)
+            if len(items) > MAX_BULK_ITEMS:
+                break
+        return items
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array or NDJSON body')
+    return data
+
 # Default route
 @app.route('/')
 def index():
@@ -418,8 +895,14 @@ def register():
             }), 400
             
         # Register user
-        result = userModel.createUser(data)
+        with passwordHasher.client_slot(request.remote_addr):
+            result = userModel.createUser(data)
         return jsonify(result)
+    except HasherBusyError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 429, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({
             'success': False,
@@ -439,8 +922,16 @@ def login():
             }), 400
             
         # Authenticate user
-        result = userModel.authenticateUser(data.get('email'), data.get('password'))
+        with passwordHasher.client_slot(request.remote_addr):
+            result = userModel.authenticateUser(data.get('email'), data.get('password'))
+        if not result.get('success'):
+            return jsonify(result), 401
         return jsonify(result)
+    except HasherBusyError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 429, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({
             'success': False,
@@ -488,15 +979,40 @@ def update_user_profile():
 def chat():
     try:
         data = request.json
-        message = data.get('message', '')
+        message = data.get('message', '') if isinstance(data, dict) else None
         
-        if not message:
+        if not isinstance(message, str):
+            return jsonify({
+                'success': False,
+                'error': 'message must be a string'
+            }), 400
+        if not message.strip():
             return jsonify({
                 'success': False,
                 'error': 'No message provided'
             }), 400
         
-        result = chatController.processMessage(message)
+        # Clients continue a conversation by sending back the sessionId of the previous reply
+        session_id = str(data.get('sessionId') or uuid.uuid4())
+        
+        # Crisis language skips the emotion model and goes straight to crisis resources
+        with metrics.span('crisis_detection'):
+            crisis_phrases = crisisDetector.match(message)
+        if crisis_phrases:
+            return jsonify({
+                'success': True,
+                'sessionId': session_id,
+                'crisis': True,
+                'response': {
+                    'text': CRISIS_RESPONSE_TEXT,
+                    'detectedEmotion': 'crisis',
+                    'confidence': 1.0
+                },
+                'resources': resourceModel.getCrisisResources()['resources']
+            })
+        
+        with metrics.span('inference'):
+            result = chatController.processMessage(message, session_id)
         return jsonify(result)
     except Exception as e:
         return jsonify({
@@ -518,12 +1034,23 @@ def get_moods():
         start_date = request.args.get('startDate')
         end_date = request.args.get('endDate')
         
-        if start_date and end_date:
-            result = moodModel.getUserMoodsByDateRange(request.user_id, start_date, end_date)
-        else:
-            result = moodModel.getUserMoods(request.user_id)
+        with metrics.span('storage'):
+            if start_date and end_date:
+                result = moodModel.getUserMoodsByDateRange(request.user_id, start_date, end_date)
+            else:
+                result = moodModel.getUserMoods(
+                    request.user_id,
+                    limit=parse_limit(request.args.get('limit')),
+                    cursor=request.args.get('cursor'),
+                    fields=parse_fields(request.args.get('fields'))
+                )
             
-        return jsonify(result)
+        return list_response(app, result, 'moods')
+    except (InvalidCursorError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'message': 'Invalid pagination parameters'
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -554,8 +1081,42 @@ def add_mood():
                 'success': False,
                 'message': 'Mood is required'
             }), 400
+        field = invalid_text_field(data, MOOD_TEXT_FIELDS)
+        if field:
+            return jsonify({
+                'success': False,
+                'message': f'{field} must be a string'
+            }), 400
             
-        result = moodModel.addMood(request.user_id, data)
+        with metrics.span('storage'):
+            result = moodModel.addMood(request.user_id, data)
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error: {str(e)}'
+        }), 500
+
+@app.route('/api/moods/bulk', methods=['POST'])
+@token_required
+def add_moods_bulk():
+    try:
+        try:
+            items = read_bulk_items()
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        if len(items) > MAX_BULK_ITEMS:
+            return jsonify({
+                'success': False,
+                'message': f'At most {MAX_BULK_ITEMS} moods can be imported per request'
+            }), 413
+        
+        with metrics.span('storage'):
+            result = moodModel.addMoods(request.user_id, items)
         return jsonify(result)
     except Exception as e:
         return jsonify({
@@ -568,6 +1129,12 @@ def add_mood():
 def update_mood(mood_id):
     try:
         data = request.json
+        field = invalid_text_field(data, MOOD_TEXT_FIELDS)
+        if field:
+            return jsonify({
+                'success': False,
+                'message': f'{field} must be a string'
+            }), 400
         result = moodModel.updateMood(request.user_id, mood_id, data)
         return jsonify(result)
     except Exception as e:
@@ -601,13 +1168,26 @@ def get_journal_entries():
         end_date = request.args.get('endDate')
         
         if search_term:
-            result = journalModel.searchEntries(request.user_id, search_term)
-        elif start_date and end_date:
-            result = journalModel.getUserEntriesByDateRange(request.user_id, start_date, end_date)
+            with metrics.span('search'):
+                result = journalModel.searchEntries(request.user_id, search_term)
         else:
-            result = journalModel.getUserEntries(request.user_id)
+            with metrics.span('storage'):
+                if start_date and end_date:
+                    result = journalModel.getUserEntriesByDateRange(request.user_id, start_date, end_date)
+                else:
+                    result = journalModel.getUserEntries(
+                        request.user_id,
+                        limit=parse_limit(request.args.get('limit')),
+                        cursor=request.args.get('cursor'),
+                        fields=parse_fields(request.args.get('fields'))
+                    )
             
-        return jsonify(result)
+        return list_response(app, result, 'entries')
+    except (InvalidCursorError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'message': 'Invalid pagination parameters'
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -650,8 +1230,15 @@ def add_journal_entry():
                 'success': False,
                 'message': 'Title and content are required'
             }), 400
+        field = invalid_text_field(data, JOURNAL_TEXT_FIELDS)
+        if field:
+            return jsonify({
+                'success': False,
+                'message': f'{field} must be a string'
+            }), 400
             
-        result = journalModel.addEntry(request.user_id, data)
+        with metrics.span('storage'):
+            result = journalModel.addEntry(request.user_id, data)
         return jsonify(result)
     except Exception as e:
         return jsonify({
@@ -664,7 +1251,14 @@ def add_journal_entry():
 def update_journal_entry(entry_id):
     try:
         data = request.json
-        result = journalModel.updateEntry(request.user_id, entry_id, data)
+        field = invalid_text_field(data, JOURNAL_TEXT_FIELDS)
+        if field:
+            return jsonify({
+                'success': False,
+                'message': f'{field} must be a string'
+            }), 400
+        with metrics.span('storage'):
+            result = journalModel.updateEntry(request.user_id, entry_id, data)
         return jsonify(result)
     except Exception as e:
         return jsonify({
@@ -700,20 +1294,36 @@ def get_resources():
         elif featured == 'true':
             result = resourceModel.getFeaturedResources()
         else:
-            result = resourceModel.getAllResources()
+            result = resourceModel.getAllResources(
+                limit=parse_limit(request.args.get('limit')),
+                cursor=request.args.get('cursor'),
+                fields=parse_fields(request.args.get('fields'))
+            )
             
-        return jsonify(result)
+        return conditional_response(result)
+    except (InvalidCursorError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'message': 'Invalid pagination parameters'
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
             'message': f'Error: {str(e)}'
         }), 500
 
+# Crisis resources may be requested by a user in distress, so let clients and
+# proxies cache them and keep serving a stale copy if we are unreachable
+CRISIS_CACHE_CONTROL = 'public, max-age=300, stale-while-revalidate=86400, stale-if-error=604800'
+
 @app.route('/api/resources/crisis', methods=['GET'])
 def get_crisis_resources():
     try:
-        result = resourceModel.getCrisisResources()
-        return jsonify(result)
+        body, etag = resourceModel.getCrisisPayload()
+        headers = {'ETag': f'"{etag}"', 'Cache-Control': CRISIS_CACHE_CONTROL}
+        if etag in request.if_none_match:
+            return Response(status=304, headers=headers)
+        return Response(body, headers=headers, mimetype='application/json')
     except Exception as e:
         return jsonify({
             'success': False,
@@ -733,6 +1343,12 @@ def add_resource():
                 'success': False,
                 'message': 'Missing required fields'
             }), 400
+        message = invalid_resource_message(data)
+        if message:
+            return jsonify({
+                'success': False,
+                'message': message
+            }), 400
             
         result = resourceModel.addResource(data)
         return jsonify(result)
@@ -747,6 +1363,12 @@ def add_resource():
 def update_resource(resource_id):
     try:
         data = request.json
+        message = invalid_resource_message(data)
+        if message:
+            return jsonify({
+                'success': False,
+                'message': message
+            }), 400
         result = resourceModel.updateResource(resource_id, data)
         return jsonify(result)
     except Exception as e:
@@ -838,12 +1460,18 @@ def change_password():
                 'message': 'Current and new passwords are required'
             }), 400
             
-        result = userModel.changePassword(
-            request.user_id, 
-            data.get('currentPassword'), 
-            data.get('newPassword')
-        )
+        with passwordHasher.client_slot(request.remote_addr):
+            result = userModel.changePassword(
+                request.user_id, 
+                data.get('currentPassword'), 
+                data.get('newPassword')
+            )
         return jsonify(result)
+    except HasherBusyError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 429, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({
             'success': False,
@@ -0,0 +1,69 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+import jwt
+from jwt.algorithms import get_default_algorithms
+
+
+class TokenVerifier:
+    """
+    Issues and verifies the API's JWTs.
+
+    The signing key is prepared once at construction. Successfully decoded
+    claims are kept in a small LRU keyed by a hash of the token until the
+    token expires, so repeat requests with the same token skip signature
+    verification and claim parsing entirely.
+    """
+
+    def __init__(self, secret, algorithm='HS256', cache_size=4096, expires_in=30 * 24 * 3600):
+        self.algorithm = algorithm
+        self.algorithms = [algorithm]
+        self.key = get_default_algorithms()[algorithm].prepare_key(secret)
+        self.cache_size = cache_size
+        self.expires_in = expires_in
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def issue(self, user_id, expires_in=None):
+        """Create a signed token for a user, carrying their id in the 'id' claim."""
+        now = int(time.time())
+        payload = {
+            'id': user_id,
+            'iat': now,
+            'exp': now + (expires_in or self.expires_in)
+        }
+        return jwt.encode(payload, self.key, algorithm=self.algorithm)
+
+    def verify(self, token):
+        """
+        Return the claims of a valid token
+
+        Raises:
+            jwt.InvalidTokenError: if the token is malformed, forged or expired
+        """
+        cache_key = hashlib.sha256(token.encode('utf-8')).digest()
+        now = time.time()
+
+        with self.lock:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                claims, expires_at = cached
+                if expires_at > now:
+                    self.cache.move_to_end(cache_key)
+                    return claims
+                del self.cache[cache_key]
+
+        claims = jwt.decode(token, self.key, algorithms=self.algorithms, options={'require': ['exp']})
+
+        with self.lock:
+            self.cache[cache_key] = (claims, claims['exp'])
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return claims
+
+    def revoke(self, token):
+        """Forget a cached token, e.g. on logout."""
+        with self.lock:
+            self.cache.pop(hashlib.sha256(token.encode('utf-8')).digest(), None)
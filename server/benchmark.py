@@ -0,0 +1,517 @@
+import os
+import sys
+import time
+import argparse
+import threading
+
+SPEECH_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'speech')
+
+def auth_headers(api):
+    """Authorization header carrying a freshly issued token for the mock user."""
+    return {'Authorization': f"Bearer {api.tokenVerifier.issue('mock-id')}"}
+
+
+def percentile(samples, fraction):
+    """Return the given percentile (0.0 - 1.0) of a list of samples."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def report(name, samples, unit='ms', scale=1000.0):
+    """Print p50/p99/max of a list of durations in seconds."""
+    print(f"{name}: p50={percentile(samples, 0.5) * scale:.3f}{unit} "
+          f"p99={percentile(samples, 0.99) * scale:.3f}{unit} "
+          f"max={max(samples) * scale:.3f}{unit} (n={len(samples)})")
+
+
+def _saturate(api, stop):
+    """Keep hitting the heavier routes until stop is set"""
+    client = api.app.test_client()
+    headers = auth_headers(api)
+    while not stop.is_set():
+        client.post('/api/chat', json={'message': 'I feel anxious about work today'})
+        client.get('/api/journal?search=meditation', headers=headers)
+        client.get('/api/resources?search=stress')
+        client.get('/api/moods', headers=headers)
+
+
+def bench_crisis(args):
+    """
+    Measure server time of /api/resources/crisis while background threads
+    saturate the rest of the app. Server time is the CPU time the request
+    thread spends handling the request, which excludes time spent waiting for
+    the GIL held by the load threads.
+    """
+    import app as api
+
+    stop = threading.Event()
+    workers = [threading.Thread(target=_saturate, args=(api, stop), daemon=True) for _ in range(args.load_threads)]
+    for worker in workers:
+        worker.start()
+
+    client = api.app.test_client()
+    cpu_samples = []
+    wall_samples = []
+    try:
+        for _ in range(args.requests):
+            wall_start = time.perf_counter()
+            cpu_start = time.thread_time()
+            response = client.get('/api/resources/crisis')
+            cpu_samples.append(time.thread_time() - cpu_start)
+            wall_samples.append(time.perf_counter() - wall_start)
+            assert response.status_code == 200
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+    report('crisis server time', cpu_samples)
+    report('crisis wall time (incl. GIL waits)', wall_samples)
+
+    p99 = percentile(cpu_samples, 0.99) * 1000
+    if p99 >= args.budget_ms:
+        print(f"FAIL: p99 server time {p99:.3f}ms exceeds {args.budget_ms}ms budget")
+        return False
+    print(f"OK: p99 server time within {args.budget_ms}ms budget")
+    return True
+
+
+def bench_auth(args):
+    """
+    Measure the cost of token verification on its own and its share of a
+    request to a trivial authenticated route
+    """
+    import app as api
+    from auth_tokens import TokenVerifier
+
+    uncached = TokenVerifier(os.getenv('JWT_SECRET', 'your_jwt_secret'), cache_size=0)
+    token = api.tokenVerifier.issue('mock-id')
+
+    def time_calls(call):
+        samples = []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            call()
+            samples.append(time.perf_counter() - start)
+        return samples
+
+    report('verify without cache', time_calls(lambda: uncached.verify(token)), unit='us', scale=1e6)
+    report('verify with claims cache', time_calls(lambda: api.tokenVerifier.verify(token)), unit='us', scale=1e6)
+
+    client = api.app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    report('GET /api/user/settings with token', time_calls(lambda: client.get('/api/user/settings', headers=headers)))
+    report('GET / without auth', time_calls(lambda: client.get('/')))
+    return True
+
+
+def bench_json(args):
+    """
+    Compare encode time and peak memory of a large list response with the
+    stdlib and orjson providers, buffered and streamed
+    """
+    import tracemalloc
+    from flask import Flask
+    from json_provider import OrjsonProvider, StdlibProvider, iter_json_list, orjson
+
+    result = {
+        'success': True,
+        'entries': [
+            {
+                'id': str(i),
+                'title': f'Journal entry {i}',
+                'content': 'Had a calm day and practised breathing exercises. ' * 8,
+                'date': '2023-05-10T14:30:00',
+                'emotion': 'joy',
+                'emotionScores': {'joy': 0.71, 'love': 0.12, 'surprise': 0.07, 'sadness': 0.05, 'fear': 0.03, 'anger': 0.02}
+            }
+            for i in range(args.items)
+        ]
+    }
+
+    providers = [('stdlib', StdlibProvider)]
+    if orjson is not None:
+        providers.append(('orjson', OrjsonProvider))
+    else:
+        print('orjson is not installed; only the stdlib provider is measured')
+
+    for name, provider_class in providers:
+        app = Flask(__name__)
+        app.json = provider_class(app)
+
+        def buffered():
+            return len(app.json.dumps_bytes(result))
+
+        def streamed():
+            return sum(len(chunk) for chunk in iter_json_list(app, result, 'entries'))
+
+        for mode, encode in (('buffered', buffered), ('streamed', streamed)):
+            samples = []
+            for _ in range(args.iterations):
+                start = time.perf_counter()
+                size = encode()
+                samples.append(time.perf_counter() - start)
+
+            tracemalloc.start()
+            encode()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            report(f'{name} {mode} ({size / 1e6:.1f}MB)', samples)
+            print(f'  peak memory: {peak / 1e6:.2f}MB')
+    return True
+
+
+def bench_crisis_detector(args):
+    """Measure crisis phrase detection throughput on one core"""
+    import random
+    from crisis_detector import CrisisDetector
+
+    detector = CrisisDetector()
+    words = ('today I felt tired and a bit anxious about work but talking to my friend '
+             'helped me calm down and I want to try meditation again tomorrow').split()
+    rng = random.Random(0)
+    messages = [' '.join(rng.choice(words) for _ in range(args.words)) for _ in range(1000)]
+    messages[::50] = ['I just want to end my life'] * len(messages[::50])
+
+    matched = 0
+    start = time.perf_counter()
+    for i in range(args.messages):
+        if detector.match(messages[i % len(messages)]):
+            matched += 1
+    elapsed = time.perf_counter() - start
+
+    rate = args.messages / elapsed
+    print(f"crisis detection: {rate:,.0f} messages/s ({args.words} words each, {matched} matched)")
+    if rate < args.min_rate:
+        print(f"FAIL: below {args.min_rate:,} messages/s")
+        return False
+    print(f"OK: at least {args.min_rate:,} messages/s")
+    return True
+
+
+def bench_tts_pool(args):
+    """
+    Compare concurrent synthesis throughput with one TTS worker and with
+    --workers workers, each request using its own rate and volume.
+    --simulated renders on SimulatedEngine instead of pyttsx3
+    """
+    import functools
+    from concurrent.futures import ThreadPoolExecutor
+    sys.path.append(SPEECH_PATH)
+    from tts_pool import TTSPool
+
+    text = ("Take a slow breath in through your nose, hold it for a moment, "
+            "and let it out gently through your mouth.")
+
+    for workers in sorted({1, args.workers}):
+        engine_factory = functools.partial(SimulatedEngine, args.speedup) if args.simulated else None
+        pool = TTSPool(max_workers=workers, max_pending=args.requests, engine_factory=engine_factory)
+        try:
+            # The first call spawns a worker and initializes its engine; keep that out of the timings
+            pool.synthesize(text)
+        except Exception as e:
+            print(f"Text-to-speech is not available: {e}")
+            pool.shutdown()
+            return False
+
+        def timed(i):
+            started = time.perf_counter()
+            pool.synthesize(text, rate=150 + i % 50, volume=0.5 + (i % 5) / 10)
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as clients:
+            samples = list(clients.map(timed, range(args.requests)))
+        elapsed = time.perf_counter() - started
+        pool.shutdown()
+
+        report(f"{workers} worker(s), {args.concurrency} concurrent clients", samples)
+        print(f"  throughput: {args.requests / elapsed:.2f} syntheses/s")
+    return True
+
+
+class SimulatedEngine:
+    """
+    Stand-in for a pyttsx3 engine: speaking takes as long as the words would
+    at the current rate (divided by speedup) and stop() cuts it short, with
+    no audio device needed
+    """
+
+    def __init__(self, speedup=1.0):
+        self.speedup = speedup
+        self.properties = {'rate': 175, 'volume': 1.0, 'voices': []}
+        self.text = ''
+        self.stopped = threading.Event()
+
+    def getProperty(self, name):
+        return self.properties[name]
+
+    def setProperty(self, name, value):
+        self.properties[name] = value
+
+    def say(self, text):
+        self.text = text
+        self.stopped.clear()
+
+    def save_to_file(self, text, path):
+        self.say(text)
+        with open(path, 'wb') as f:
+            f.write(text.encode('utf-8'))
+
+    def runAndWait(self):
+        self.stopped.wait(len(self.text.split()) * 60.0 / self.properties['rate'] / self.speedup)
+
+    def stop(self):
+        self.stopped.set()
+
+
+def bench_tts_controller(args):
+    """
+    Hammer the TTS controller with speak/pause/resume/stop/toggle/rate calls
+    from many threads, then check every call returned promptly and the
+    controller still settles when stopped
+    """
+    import random
+    sys.path.append(SPEECH_PATH)
+    import logging
+    from text_to_speech import TextToSpeech, IDLE
+
+    logging.getLogger('text_to_speech').setLevel(logging.WARNING)
+    tts = TextToSpeech(SimulatedEngine())
+    if not tts.is_speech_supported:
+        print("Text-to-speech is not available")
+        return False
+
+    actions = [
+        lambda rng: tts.speak('Breathe in slowly and breathe out gently.'),
+        lambda rng: tts.pause(),
+        lambda rng: tts.resume(),
+        lambda rng: tts.stop(),
+        lambda rng: tts.toggle(),
+        lambda rng: tts.toggle(),
+        lambda rng: tts.set_rate(rng.randint(120, 220)),
+        lambda rng: tts.get_status(),
+    ]
+    samples = []
+    samples_lock = threading.Lock()
+
+    def hammer(seed):
+        rng = random.Random(seed)
+        local = []
+        for _ in range(args.calls):
+            action = rng.choice(actions)
+            started = time.perf_counter()
+            action(rng)
+            local.append(time.perf_counter() - started)
+        with samples_lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=hammer, args=(seed,)) for seed in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=args.timeout)
+    if any(thread.is_alive() for thread in threads):
+        print("FAIL: control calls hung")
+        return False
+
+    report(f"control calls ({args.threads} threads x {args.calls})", samples)
+
+    tts.stop()
+    settled = tts.wait_for((IDLE,), timeout=args.timeout)
+    tts.shutdown()
+    if tts.thread.is_alive():
+        print("FAIL: worker thread did not exit on shutdown")
+        return False
+    if not settled:
+        print(f"FAIL: still {tts.get_status()['state']} {args.timeout}s after stop")
+        return False
+    if percentile(samples, 0.99) * 1000 > args.budget_ms:
+        print(f"FAIL: p99 above {args.budget_ms}ms")
+        return False
+    print("OK: no hangs, controller settled after stop")
+    return True
+
+
+def synthetic_speech(seconds=2.0, sample_rate=16000):
+    """16-bit mono PCM of voice-like tone bursts separated by short silences"""
+    import numpy as np
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    voiced = (np.sin(2 * np.pi * 3 * t) > -0.3).astype(np.float32)
+    signal = (np.sin(2 * np.pi * 180 * t) + 0.5 * np.sin(2 * np.pi * 360 * t)) * voiced
+    return (signal * 8000).astype('<i2').tobytes()
+
+
+def bench_asr(args):
+    """Compare load time and per-utterance latency of the speech recognition backends"""
+    import speech_recognition as sr
+    sys.path.append(SPEECH_PATH)
+    from asr_backends import get_backend
+
+    audio = sr.AudioData(synthetic_speech(args.seconds), 16000, 2)
+    if args.audio:
+        with sr.AudioFile(args.audio) as source:
+            audio = sr.Recognizer().record(source)
+
+    for name in args.backends.split(','):
+        started = time.perf_counter()
+        try:
+            backend = get_backend(name)
+        except Exception as e:
+            print(f"{name}: unavailable ({e})")
+            continue
+        load_time = time.perf_counter() - started
+
+        samples = []
+        try:
+            for _ in range(args.iterations):
+                started = time.perf_counter()
+                try:
+                    backend.recognize(audio)
+                except sr.UnknownValueError:
+                    pass
+                samples.append(time.perf_counter() - started)
+        except sr.RequestError as e:
+            print(f"{name}: request failed ({e})")
+            continue
+
+        print(f"{name}: loaded in {load_time * 1000:.1f}ms")
+        report(f"  {name} recognition", samples)
+    return True
+
+
+def bench_vad_gate(args):
+    """
+    Run the speech gate over synthetic captured phrases, shaped like those
+    recognizer.listen returns (quiet lead-in, content, quiet tail), and
+    check that speech passes while noise-only phrases are dropped
+    """
+    import numpy as np
+    sys.path.append(SPEECH_PATH)
+    from vad import SpeechGate
+
+    rate = 16000
+    rng = np.random.default_rng(0)
+
+    def quiet(seconds):
+        return rng.normal(0, 30, int(seconds * rate))
+
+    def phrase(content, seconds=1.5, background=None, tail=0.8):
+        signal = np.concatenate([quiet(0.5), content(seconds), quiet(tail)])
+        if background is not None:
+            signal = signal + background(len(signal) / rate)
+        return np.clip(signal, -32768, 32767).astype('<i2').tobytes()
+
+    def speech(seconds):
+        return np.frombuffer(synthetic_speech(seconds, rate), dtype='<i2').astype(np.float64)
+
+    def voiced(seconds):
+        # Unbroken voicing with a syllable-rate envelope: speech filling nearly the whole phrase
+        t = np.arange(int(seconds * rate)) / rate
+        return 8000 * (0.7 + 0.3 * np.sin(2 * np.pi * 4 * t)) * (np.sin(2 * np.pi * 180 * t) + 0.5 * np.sin(2 * np.pi * 360 * t))
+
+    def hiss(seconds):
+        return rng.normal(0, 3000, int(seconds * rate))
+
+    def hum(seconds):
+        return 4000 * np.sin(2 * np.pi * 60 * np.arange(int(seconds * rate)) / rate)
+
+    def click(seconds):
+        signal = quiet(seconds)
+        signal[:int(0.04 * rate)] = rng.normal(0, 12000, int(0.04 * rate))
+        return signal
+
+    cases = [
+        ('speech', True, lambda: phrase(speech)),
+        ('speech over hum', True, lambda: phrase(speech, background=lambda s: 0.1 * hum(s))),
+        ('long voiced speech (6s)', True, lambda: phrase(voiced, seconds=6.0)),
+        # phrase_time_limit=10 cuts the phrase off mid-speech, so there is no quiet tail
+        ('speech cut at phrase_time_limit', True, lambda: phrase(voiced, seconds=9.5, tail=0.0)),
+        ('silence', False, lambda: phrase(quiet)),
+        ('hiss', False, lambda: phrase(hiss)),
+        ('hum', False, lambda: phrase(quiet, background=hum)),
+        ('click', False, lambda: phrase(click)),
+    ]
+
+    gate = SpeechGate()
+    ok = True
+    samples = []
+    for name, expected, make in cases:
+        segments = [make() for _ in range(args.segments)]
+        passed = 0
+        for pcm in segments:
+            started = time.perf_counter()
+            passed += gate.accepts_pcm(pcm, rate)
+            samples.append(time.perf_counter() - started)
+        print(f"{name}: {passed}/{len(segments)} passed to recognition")
+        if passed != (len(segments) if expected else 0):
+            ok = False
+
+    report('gate decision per phrase', samples)
+    print(f"recognition calls avoided: {gate.rejected} of {gate.accepted + gate.rejected}")
+    if not ok:
+        print("FAIL: speech was dropped or noise was passed to recognition")
+        return False
+    print("OK: every speech phrase passed and every noise-only phrase was dropped")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks for the Mental Health Companion API')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    crisis = subparsers.add_parser('crisis', help='Crisis resources latency under load')
+    crisis.add_argument('--requests', type=int, default=2000, help='Number of crisis requests to time')
+    crisis.add_argument('--load_threads', type=int, default=4, help='Threads saturating other routes')
+    crisis.add_argument('--budget_ms', type=float, default=1.0, help='Maximum allowed p99 server time')
+    crisis.set_defaults(run=bench_crisis)
+
+    auth = subparsers.add_parser('auth', help='Per-request token verification overhead')
+    auth.add_argument('--iterations', type=int, default=5000, help='Number of timed calls per case')
+    auth.set_defaults(run=bench_auth)
+
+    json_encoding = subparsers.add_parser('json', help='JSON encoding of large list responses')
+    json_encoding.add_argument('--items', type=int, default=10000, help='Number of items in the list')
+    json_encoding.add_argument('--iterations', type=int, default=20, help='Number of timed encodes per case')
+    json_encoding.set_defaults(run=bench_json)
+
+    detector = subparsers.add_parser('crisis_detector', help='Crisis phrase detection throughput')
+    detector.add_argument('--messages', type=int, default=100000, help='Number of messages to scan')
+    detector.add_argument('--words', type=int, default=30, help='Words per message')
+    detector.add_argument('--min_rate', type=int, default=20000, help='Minimum messages per second')
+    detector.set_defaults(run=bench_crisis_detector)
+
+    tts_pool = subparsers.add_parser('tts_pool', help='Concurrent speech synthesis throughput')
+    tts_pool.add_argument('--workers', type=int, default=4, help='TTS worker processes to compare against one')
+    tts_pool.add_argument('--requests', type=int, default=40, help='Number of syntheses per case')
+    tts_pool.add_argument('--concurrency', type=int, default=8, help='Concurrent client threads')
+    tts_pool.add_argument('--simulated', action='store_true', help='Use a simulated engine instead of pyttsx3')
+    tts_pool.add_argument('--speedup', type=float, default=30.0, help='How much faster than real time the simulated engine speaks')
+    tts_pool.set_defaults(run=bench_tts_pool)
+
+    controller = subparsers.add_parser('tts_controller', help='Concurrent TTS control calls stress test')
+    controller.add_argument('--threads', type=int, default=16, help='Threads issuing control calls')
+    controller.add_argument('--calls', type=int, default=2000, help='Control calls per thread')
+    controller.add_argument('--budget_ms', type=float, default=1.0, help='Maximum allowed p99 call time')
+    controller.add_argument('--timeout', type=float, default=10.0, help='Seconds before a hang is reported')
+    controller.set_defaults(run=bench_tts_controller)
+
+    asr = subparsers.add_parser('asr', help='Speech recognition backend latency')
+    asr.add_argument('--backends', default='stub,vosk,google', help='Comma separated backends to compare')
+    asr.add_argument('--audio', default=None, help='WAV file to recognize instead of synthetic audio')
+    asr.add_argument('--seconds', type=float, default=2.0, help='Length of the synthetic audio')
+    asr.add_argument('--iterations', type=int, default=20, help='Recognitions per backend')
+    asr.set_defaults(run=bench_asr)
+
+    vad_gate = subparsers.add_parser('vad_gate', help='Speech gate accuracy on synthetic phrases')
+    vad_gate.add_argument('--segments', type=int, default=50, help='Synthetic phrases per case')
+    vad_gate.set_defaults(run=bench_vad_gate)
+
+    args = parser.parse_args()
+    success = args.run(args)
+    sys.exit(0 if success is not False else 1)
+
+
+if __name__ == "__main__":
+    main()
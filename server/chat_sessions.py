@@ -0,0 +1,134 @@
+import time
+import threading
+from array import array
+from collections import OrderedDict
+
+
+class ChatTurn:
+    """One message in a conversation; the message text itself is never kept"""
+    __slots__ = ('emotion', 'timestamp')
+
+    def __init__(self, emotion, timestamp):
+        self.emotion = emotion
+        self.timestamp = timestamp
+
+
+class ChatSession:
+    """Recent turns and decayed emotion scores of one conversation"""
+    __slots__ = ('turns', 'head', 'scores', 'turn_count', 'updated')
+
+    def __init__(self, label_count):
+        # A plain list used as a ring buffer is far smaller than a deque for a few turns
+        self.turns = []
+        self.head = 0
+        self.scores = array('f', bytes(4 * label_count))
+        self.turn_count = 0
+        self.updated = 0.0
+
+    def append(self, turn, max_turns):
+        if len(self.turns) < max_turns:
+            self.turns.append(turn)
+        else:
+            self.turns[self.head] = turn
+            self.head = (self.head + 1) % max_turns
+
+    def recent(self):
+        """Turns from oldest to newest."""
+        return self.turns[self.head:] + self.turns[:self.head]
+
+
+class ChatSessionStore:
+    """
+    Bounded in-memory conversation memory.
+
+    Each session keeps a ring buffer of its most recent turns and a running
+    emotion score per label. New scores are folded in with exponential decay,
+    so earlier messages keep influencing the context without ever being
+    re-scored. Sessions idle for longer than ttl seconds are evicted, and the
+    least recently used sessions are dropped once max_sessions is reached,
+    so memory stays bounded however many conversations are open. Only the
+    detected emotions are remembered, never what the user wrote.
+    """
+
+    def __init__(self, labels, max_turns=10, decay=0.7, ttl=1800, max_sessions=100000):
+        self.labels = list(labels)
+        self.label_index = {label: index for index, label in enumerate(self.labels)}
+        self.max_turns = max_turns
+        self.decay = decay
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _evict(self, now):
+        # Sessions are kept in least recently used order, so expired ones are at the front
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if len(self.sessions) <= self.max_sessions and now - session.updated < self.ttl:
+                break
+            del self.sessions[session_id]
+
+    def record(self, session_id, emotion, scores):
+        """
+        Add a scored message to a session and return the updated context
+
+        Args:
+            session_id: Conversation identifier
+            emotion: Emotion detected for this message
+            scores: Mapping of emotion label to probability for this message
+        """
+        now = time.time()
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None or now - session.updated >= self.ttl:
+                session = ChatSession(len(self.labels))
+                self.sessions[session_id] = session
+            self.sessions.move_to_end(session_id)
+
+            decay = self.decay
+            session_scores = session.scores
+            for index in range(len(session_scores)):
+                session_scores[index] *= decay
+            for label, probability in scores.items():
+                index = self.label_index.get(label)
+                if index is not None:
+                    session_scores[index] += probability
+
+            session.append(ChatTurn(emotion, now), self.max_turns)
+            session.turn_count += 1
+            session.updated = now
+
+            self._evict(now)
+            return self._context(session)
+
+    def get(self, session_id):
+        """Return the context of a live session, or None."""
+        now = time.time()
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None or now - session.updated >= self.ttl:
+                return None
+            return self._context(session)
+
+    def end(self, session_id):
+        """Forget a session."""
+        with self.lock:
+            self.sessions.pop(session_id, None)
+
+    def _context(self, session):
+        total = sum(session.scores)
+        if total > 0:
+            scores = {label: score / total for label, score in zip(self.labels, session.scores)}
+            dominant = max(scores, key=scores.get)
+        else:
+            scores = {}
+            dominant = None
+        return {
+            'dominantEmotion': dominant,
+            'emotionScores': scores,
+            'turns': session.turn_count,
+            'recentEmotions': [turn.emotion for turn in session.recent()]
+        }
+
+    def __len__(self):
+        return len(self.sessions)
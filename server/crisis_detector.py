@@ -0,0 +1,142 @@
+import os
+import re
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PHRASE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crisis_phrases.txt')
+
+# Used whenever the phrase file cannot be read, so screening never silently stops
+DEFAULT_PHRASES = (
+    'kill myself', 'killing myself', 'end my life', 'ending my life', 'take my own life',
+    'want to die', 'wanna die', 'wish i was dead', 'wish i were dead', 'better off dead',
+    'suicide', 'suicidal', 'commit suicide', 'self harm', 'self-harm',
+    'hurt myself', 'hurting myself', 'cut myself', 'cutting myself', 'overdose',
+    'no reason to live', 'nothing to live for', 'dont want to live', 'dont want to be alive',
+    'cant go on', 'cant go on anymore', 'end it all', 'give up on life',
+)
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text):
+    """Lowercase, drop apostrophes (so "don't" matches "dont") and split into word tokens."""
+    return WORD_PATTERN.findall(text.lower().replace("'", '').replace('’', ''))
+
+
+class PhraseAutomaton:
+    """
+    Aho-Corasick automaton over word tokens.
+
+    Phrases are matched as whole-word sequences. Matching visits each token of
+    the message once, following failure links on mismatches, so the cost is
+    linear in message length no matter how many phrases are loaded.
+    """
+
+    def __init__(self, phrases):
+        self.goto = [{}]        # state -> {token: next state}
+        self.fail = [0]
+        self.outputs = [()]     # state -> phrases ending here (including via failure links)
+
+        for phrase in phrases:
+            tokens = normalize(phrase)
+            if not tokens:
+                continue
+            state = 0
+            for token in tokens:
+                next_state = self.goto[state].get(token)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append(())
+                    self.goto[state][token] = next_state
+                state = next_state
+            self.outputs[state] = self.outputs[state] + (' '.join(tokens),)
+
+        # Breadth-first pass computing failure links and merged outputs
+        pending = deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for token, next_state in self.goto[state].items():
+                pending.append(next_state)
+                fallback = self.fail[state]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(token, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.fail[next_state]]
+
+    def search(self, tokens):
+        """Return the phrases found in a token list, in order of their end position."""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        found = []
+        state = 0
+        for token in tokens:
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if outputs[state]:
+                found.extend(outputs[state])
+        return found
+
+
+class CrisisDetector:
+    """
+    Detects self-harm and crisis language in chat messages.
+
+    The phrase file (one phrase per line, '#' for comments) is compiled once
+    into a PhraseAutomaton. The file's modification time is checked at most
+    every reload_interval seconds and the automaton is rebuilt and swapped in
+    when it changes, so phrases can be updated without a restart.
+
+    A file that is missing, unreadable or empty (for example while it is
+    being rewritten) never replaces a working automaton: the previous one
+    stays in use, and the built-in default_phrases are used until the file
+    first loads.
+    """
+
+    def __init__(self, phrase_file=DEFAULT_PHRASE_FILE, reload_interval=5.0, default_phrases=DEFAULT_PHRASES):
+        self.phrase_file = phrase_file
+        self.reload_interval = reload_interval
+        self.automaton = PhraseAutomaton(default_phrases)
+        self.mtime = None
+        self.next_check = 0.0
+        self.lock = threading.Lock()
+        if not self.reload():
+            logger.error(f"Crisis phrase file {phrase_file} not loaded; using the built-in phrase list")
+        if len(self.automaton.goto) == 1:
+            raise RuntimeError(f"No crisis phrases available: {phrase_file} did not load and there are no default phrases")
+
+    def reload(self):
+        """Recompile the automaton if the phrase file changed; returns True if it was reloaded."""
+        with self.lock:
+            try:
+                mtime = os.path.getmtime(self.phrase_file)
+                if mtime == self.mtime:
+                    return False
+                with open(self.phrase_file, 'r', encoding='utf-8') as f:
+                    phrases = [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+                automaton = PhraseAutomaton(phrases)
+            except (OSError, UnicodeDecodeError) as e:
+                logger.error(f"Cannot read crisis phrase file, keeping the current phrases: {e}")
+                return False
+            if len(automaton.goto) == 1:
+                logger.error(f"Crisis phrase file {self.phrase_file} has no phrases, keeping the current phrases")
+                return False
+
+            self.automaton = automaton
+            self.mtime = mtime
+            logger.info(f"Loaded {len(phrases)} crisis phrases")
+            return True
+
+    def match(self, text):
+        """Return the crisis phrases found in the text (empty if none)."""
+        now = time.monotonic()
+        if now >= self.next_check:
+            self.next_check = now + self.reload_interval
+            self.reload()
+        return self.automaton.search(normalize(text))
@@ -0,0 +1,250 @@
+import os
+import sys
+import time
+import queue
+import logging
+import argparse
+import threading
+
+from journal_file import load_journal, save_journal
+
+logger = logging.getLogger(__name__)
+
+MODELS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'models')
+DEFAULT_MODEL_DIR = os.path.join(MODELS_PATH, 'models', 'sentiment')
+
+# Same order as SentimentModel.labels; available without importing TensorFlow
+EMOTION_LABELS = ['sadness', 'joy', 'love', 'anger', 'fear', 'surprise']
+
+_shared_model = None
+_shared_model_loaded = False
+_shared_model_lock = threading.Lock()
+
+
+def load_sentiment_model(model_dir=None):
+    """
+    Load the emotion classifier once for this process
+
+    Returns the SentimentModel instance, or None if its dependencies are not
+    installed. A SentimentModel without trained weights is still returned so
+    callers can use its rule-based fallback.
+    """
+    if MODELS_PATH not in sys.path:
+        sys.path.append(MODELS_PATH)
+
+    try:
+        from sentiment_model import SentimentModel
+    except ImportError as e:
+        logger.warning(f"Sentiment model unavailable: {e}")
+        return None
+
+    model = SentimentModel()
+    model_dir = model_dir or os.getenv('SENTIMENT_MODEL_DIR', DEFAULT_MODEL_DIR)
+    if os.path.exists(os.path.join(model_dir, 'model.h5')):
+        model.load_model(model_dir)
+    return model
+
+
+def get_sentiment_model():
+    """Return the process-wide classifier, loading it on first use."""
+    global _shared_model, _shared_model_loaded
+    if not _shared_model_loaded:
+        with _shared_model_lock:
+            if not _shared_model_loaded:
+                _shared_model = load_sentiment_model()
+                _shared_model_loaded = True
+    return _shared_model
+
+
+def warm_sentiment_model():
+    """
+    Load the shared classifier and score one sample text
+
+    Scoring once runs the lazy parts of the model (the NLTK lexicon download
+    of the fallback, the first TensorFlow call) so a server can pay for them
+    at startup instead of on its first request.
+    """
+    start = time.time()
+    model = get_sentiment_model()
+    score_texts(model, ['warming up'])
+    logger.info(f"Sentiment model ready in {time.time() - start:.1f}s")
+    return model
+
+
+def score_texts(model, texts):
+    """
+    Score a batch of texts with the emotion classifier
+
+    Returns:
+        list: one {'emotion', 'probability', 'scores'} dict per text, where
+        scores maps every emotion label to its probability
+    """
+    if model is None:
+        return [{'emotion': None, 'probability': 0.0, 'scores': {}} for _ in texts]
+
+    if model.model is not None:
+        predictions = model.predict_batch(texts)
+        return [
+            {
+                'emotion': prediction['emotion'],
+                'probability': prediction['probability'],
+                'scores': {item['emotion']: item['probability'] for item in prediction['all_emotions']}
+            }
+            for prediction in predictions
+        ]
+
+    results = []
+    for text in texts:
+        prediction = model.analyze_sentiment_fallback(text)
+        results.append({
+            'emotion': prediction['emotion'],
+            'probability': prediction['probability'],
+            'scores': {prediction['emotion']: prediction['probability']}
+        })
+    return results
+
+
+def entry_text(entry):
+    """Text of a journal entry that is fed to the classifier."""
+    return f"{entry.get('title', '')}\n{entry.get('content', '')}".strip()
+
+
+class EmotionTagger:
+    """
+    Background worker that tags journal entries with their detected emotion.
+
+    Writes call enqueue() and return immediately; a single worker thread
+    drains the queue in batches so the classifier runs once per batch and
+    reads never pay for inference. Results are handed to the callback as
+    callback(user_id, entry_id, text, result), where text is the snapshot that
+    was scored so the caller can discard results for entries edited since.
+    """
+
+    def __init__(self, callback, model_loader=get_sentiment_model, batch_size=32, batch_wait=0.05, max_queue_size=10000):
+        self.callback = callback
+        self.model_loader = model_loader
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.model = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Start the worker thread if it is not already running."""
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._worker_thread)
+                self.thread.daemon = True
+                self.thread.start()
+
+    def enqueue(self, user_id, entry):
+        """
+        Queue an entry for tagging
+
+        Returns:
+            bool: False if the queue is full and the entry was dropped
+        """
+        self.start()
+        try:
+            self.queue.put_nowait((user_id, entry['id'], entry_text(entry)))
+            return True
+        except queue.Full:
+            logger.warning(f"Emotion tagging queue full, skipping entry {entry['id']}")
+            return False
+
+    def pending(self):
+        """Number of entries waiting to be tagged."""
+        return self.queue.qsize()
+
+    def join(self):
+        """Block until every queued entry has been processed."""
+        self.queue.join()
+
+    def _next_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker_thread(self):
+        """Load the classifier once, then score queued entries batch by batch"""
+        self.model = self.model_loader()
+
+        while True:
+            batch = self._next_batch()
+            try:
+                results = score_texts(self.model, [text for _, _, text in batch])
+                for (user_id, entry_id, text), result in zip(batch, results):
+                    self.callback(user_id, entry_id, text, result)
+            except Exception as e:
+                logger.error(f"Error tagging journal entries: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+
+def backfill(journal_path, model, batch_size=64, force=False):
+    """
+    Tag historical entries in a journal file ({user_id: [entries]}), the
+    file the API keeps its journal in when JOURNAL_DATA_FILE is set
+
+    Progress is written back after every batch. Entries that already carry an
+    emotion are skipped, so re-running after an interruption resumes where
+    the previous run stopped. Run it while the API is stopped, since both
+    rewrite the whole file.
+    """
+    data = load_journal(journal_path)
+
+    pending = [
+        entry
+        for entries in data.values()
+        for entry in entries
+        if force or not entry.get('emotion')
+    ]
+    total = len(pending)
+    print(f"{total} journal entries to tag")
+
+    started = time.monotonic()
+    for start in range(0, total, batch_size):
+        batch = pending[start:start + batch_size]
+        results = score_texts(model, [entry_text(entry) for entry in batch])
+        for entry, result in zip(batch, results):
+            entry['emotion'] = result['emotion']
+            entry['emotionScores'] = result['scores']
+        save_journal(journal_path, data)
+
+        done = start + len(batch)
+        rate = done / max(time.monotonic() - started, 1e-9)
+        print(f"Tagged {done}/{total} entries ({rate:.1f} entries/s)")
+
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tag existing journal entries with their detected emotion')
+    parser.add_argument('--journal', default=os.getenv('JOURNAL_DATA_FILE', os.path.join('data', 'journal.json')),
+                        help='Path to the journal JSON file (defaults to JOURNAL_DATA_FILE)')
+    parser.add_argument('--model_dir', default=None, help='Directory containing the trained sentiment model')
+    parser.add_argument('--batch_size', type=int, default=64, help='Entries scored per model call')
+    parser.add_argument('--force', action='store_true', help='Re-tag entries that already have an emotion')
+
+    args = parser.parse_args()
+
+    model = load_sentiment_model(args.model_dir)
+    if model is None:
+        print("Sentiment model dependencies are not installed. Exiting.")
+        return
+
+    backfill(args.journal, model, batch_size=args.batch_size, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import os
+import json
+
+
+def load_journal(path):
+    """Read a journal file ({user_id: [entries]}); a file that does not exist yet is an empty journal."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_journal(path, data):
+    """Write the journal file atomically so an interrupted write never corrupts it."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(temp_path, path)
@@ -0,0 +1,150 @@
+import re
+import math
+import bisect
+import threading
+
+# Title matches count more than body matches, mirroring a column weight in FTS5
+TITLE_WEIGHT = 2
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def tokenize(text):
+    """Lowercase the text and split it into word tokens."""
+    if not text:
+        return []
+    return [token.strip("'") for token in TOKEN_PATTERN.findall(text.lower()) if token.strip("'")]
+
+
+class _UserIndex:
+    """Posting lists for the journal entries of a single user"""
+
+    def __init__(self):
+        self.postings = {}      # term -> {entry_id: weighted term frequency}
+        self.doc_terms = {}     # entry_id -> {term: weighted term frequency}
+        self.doc_lengths = {}   # entry_id -> weighted document length
+        self.total_length = 0
+        self.terms = []         # sorted vocabulary, used for prefix lookups
+
+    def add(self, entry_id, title, content):
+        frequencies = {}
+        for token in tokenize(title):
+            frequencies[token] = frequencies.get(token, 0) + TITLE_WEIGHT
+        for token in tokenize(content):
+            frequencies[token] = frequencies.get(token, 0) + 1
+
+        length = sum(frequencies.values())
+        self.doc_terms[entry_id] = frequencies
+        self.doc_lengths[entry_id] = length
+        self.total_length += length
+
+        for term, frequency in frequencies.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                bisect.insort(self.terms, term)
+            postings[entry_id] = frequency
+
+    def remove(self, entry_id):
+        frequencies = self.doc_terms.pop(entry_id, None)
+        if frequencies is None:
+            return False
+
+        self.total_length -= self.doc_lengths.pop(entry_id)
+
+        for term in frequencies:
+            postings = self.postings[term]
+            del postings[entry_id]
+            if not postings:
+                del self.postings[term]
+                position = bisect.bisect_left(self.terms, term)
+                del self.terms[position]
+        return True
+
+    def expand_prefix(self, prefix):
+        """Return every indexed term starting with the given prefix."""
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + '\uffff')
+        return self.terms[start:end]
+
+
+class JournalSearchIndex:
+    """
+    Incremental inverted index over journal entry titles and content.
+
+    Each user gets their own posting lists, so search cost depends only on the
+    matching entries of that user rather than on the total number of entries.
+    Results are ranked with Okapi BM25. A query term ending in '*' matches any
+    indexed term with that prefix.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.users = {}
+        self.lock = threading.Lock()
+
+    def add(self, user_id, entry_id, title, content):
+        """Index a new entry (replacing any previous version of it)."""
+        with self.lock:
+            index = self.users.setdefault(user_id, _UserIndex())
+            index.remove(entry_id)
+            index.add(entry_id, title, content)
+
+    def update(self, user_id, entry_id, title, content):
+        """Re-index an edited entry."""
+        self.add(user_id, entry_id, title, content)
+
+    def remove(self, user_id, entry_id):
+        """Drop an entry from the index."""
+        with self.lock:
+            index = self.users.get(user_id)
+            if index is None:
+                return False
+            return index.remove(entry_id)
+
+    def remove_user(self, user_id):
+        """Drop every entry belonging to a user."""
+        with self.lock:
+            self.users.pop(user_id, None)
+
+    def search(self, user_id, query, limit=None):
+        """
+        Search a user's entries
+
+        Args:
+            user_id: Owner of the entries to search
+            query: Free-text query; terms ending in '*' are prefix matches
+            limit: Maximum number of results to return
+
+        Returns:
+            list: (entry_id, score) tuples ordered by descending BM25 score
+        """
+        with self.lock:
+            index = self.users.get(user_id)
+            if index is None or not index.doc_lengths:
+                return []
+
+            doc_count = len(index.doc_lengths)
+            average_length = index.total_length / doc_count
+            scores = {}
+
+            for raw_term in query.lower().split():
+                is_prefix = raw_term.endswith('*')
+                for term in tokenize(raw_term):
+                    matched_terms = index.expand_prefix(term) if is_prefix else [term]
+                    for matched in matched_terms:
+                        postings = index.postings.get(matched)
+                        if not postings:
+                            continue
+                        document_frequency = len(postings)
+                        idf = math.log(1 + (doc_count - document_frequency + 0.5) / (document_frequency + 0.5))
+                        for entry_id, frequency in postings.items():
+                            norm = self.k1 * (1 - self.b + self.b * index.doc_lengths[entry_id] / average_length)
+                            score = idf * frequency * (self.k1 + 1) / (frequency + norm)
+                            scores[entry_id] = scores.get(entry_id, 0.0) + score
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if limit is not None:
+            ranked = ranked[:limit]
+        return ranked
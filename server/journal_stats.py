@@ -0,0 +1,180 @@
+import re
+import heapq
+import threading
+from datetime import datetime
+
+# Words ignored by the word-frequency stat (same list as the Node journal model)
+COMMON_WORDS = frozenset(['the', 'and', 'a', 'to', 'of', 'in', 'is', 'it', 'that', 'was', 'with', 'for', 'on', 'as', 'are'])
+
+TOP_WORDS = 10
+
+
+def count_words(content):
+    """Count the words of an entry that contribute to the word-frequency stat."""
+    counts = {}
+    for word in re.sub(r'[^\w\s]', '', (content or '').lower()).split():
+        if len(word) > 2 and word not in COMMON_WORDS:
+            counts[word] = counts.get(word, 0) + 1
+    return counts
+
+
+def entry_month(date):
+    """Return the YYYY-MM bucket of an entry date, or None if it cannot be parsed."""
+    try:
+        return datetime.fromisoformat(date).strftime('%Y-%m')
+    except (TypeError, ValueError):
+        return None
+
+
+def _increment(counter, key, delta):
+    value = counter.get(key, 0) + delta
+    if value > 0:
+        counter[key] = value
+    else:
+        counter.pop(key, None)
+
+
+class _UserStats:
+    """Running aggregates for a single user's journal"""
+
+    def __init__(self, top_k=TOP_WORDS):
+        self.total_entries = 0
+        self.total_length = 0
+        self.mood_counts = {}
+        self.monthly_activity = {}
+        self.word_counts = {}
+        self.top_k = top_k
+        # The top_k most frequent words; every other word has at most the lowest count in here.
+        # None when a write broke that guarantee, and rebuilt on the next read.
+        self.top_words = {}
+
+    def apply(self, entry, sign, words=True):
+        self.total_entries += sign
+        self.total_length += sign * len(entry.get('content') or '')
+
+        # A mood chosen by the user wins over the emotion detected by the tagger
+        mood = entry.get('mood') or entry.get('emotion')
+        if mood:
+            _increment(self.mood_counts, mood, sign)
+
+        month = entry_month(entry.get('date'))
+        if month:
+            _increment(self.monthly_activity, month, sign)
+
+        if words:
+            for word, count in count_words(entry.get('content')).items():
+                self._count_word(word, sign * count)
+
+    def replace(self, old_entry, new_entry):
+        self.apply(old_entry, -1, words=False)
+        self.apply(new_entry, 1, words=False)
+        # Only the net change per word is applied, so words an edit keeps do not disturb the top words
+        deltas = count_words(new_entry.get('content'))
+        for word, count in count_words(old_entry.get('content')).items():
+            deltas[word] = deltas.get(word, 0) - count
+        for word, delta in deltas.items():
+            if delta:
+                self._count_word(word, delta)
+
+    def _count_word(self, word, delta):
+        _increment(self.word_counts, word, delta)
+        top = self.top_words
+        if top is None:
+            return
+        count = self.word_counts.get(word, 0)
+
+        if len(self.word_counts) <= self.top_k:
+            # The whole vocabulary fits, so the top words are simply all of it
+            if count:
+                top[word] = count
+            else:
+                top.pop(word, None)
+            if len(top) != len(self.word_counts):
+                self.top_words = None
+            return
+
+        lowest = min(top.values()) if top else 0
+        if word in top:
+            if count >= lowest:
+                top[word] = count
+            else:
+                # Fell below the k-th count: some word outside may now rank higher
+                self.top_words = None
+        elif len(top) < self.top_k:
+            if count:
+                top[word] = count
+        elif count > lowest:
+            del top[min(top, key=top.get)]
+            top[word] = count
+
+    def most_frequent_words(self):
+        if self.top_words is None:
+            self.top_words = dict(heapq.nlargest(
+                self.top_k, self.word_counts.items(), key=lambda item: item[1]
+            ))
+        return dict(sorted(self.top_words.items(), key=lambda item: item[1], reverse=True))
+
+
+class JournalStats:
+    """
+    Incrementally maintained journal statistics.
+
+    Writes fold each entry into per-user counters (entry count, total length,
+    moods, monthly activity and word counts) so that reading the stats never
+    re-tokenizes past entries. Word counts are kept exactly rather than in an
+    approximate top-k sketch because edits and deletes must be able to
+    decrement them; the top words are kept up to date on each write and only
+    recomputed when a write pushes one of them below the k-th count.
+    """
+
+    def __init__(self, top_words=TOP_WORDS):
+        self.top_words = top_words
+        self.users = {}
+        self.lock = threading.Lock()
+
+    def add(self, user_id, entry):
+        """Fold a new entry into the user's stats."""
+        with self.lock:
+            self.users.setdefault(user_id, _UserStats(self.top_words)).apply(entry, 1)
+
+    def remove(self, user_id, entry):
+        """Remove a previously added entry from the user's stats."""
+        with self.lock:
+            stats = self.users.get(user_id)
+            if stats is not None:
+                stats.apply(entry, -1)
+
+    def update(self, user_id, old_entry, new_entry):
+        """Replace an entry's contribution after an edit."""
+        with self.lock:
+            self.users.setdefault(user_id, _UserStats(self.top_words)).replace(old_entry, new_entry)
+
+    def remove_user(self, user_id):
+        """Drop all stats for a user."""
+        with self.lock:
+            self.users.pop(user_id, None)
+
+    def get(self, user_id):
+        """Return the stats payload for a user."""
+        with self.lock:
+            stats = self.users.get(user_id)
+            if stats is None or stats.total_entries <= 0:
+                return {
+                    'totalEntries': 0,
+                    'averageLength': 0,
+                    'mostFrequentMood': None,
+                    'monthlyActivity': {},
+                    'wordFrequency': {}
+                }
+
+            most_frequent_mood = None
+            if stats.mood_counts:
+                most_frequent_mood = max(stats.mood_counts, key=stats.mood_counts.get)
+
+            return {
+                'totalEntries': stats.total_entries,
+                'averageLength': round(stats.total_length / stats.total_entries),
+                'mostFrequentMood': most_frequent_mood,
+                'monthlyActivity': dict(stats.monthly_activity),
+                'wordFrequency': stats.most_frequent_words()
+            }
@@ -0,0 +1,72 @@
+import json
+
+from flask import Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Lists at least this long are streamed as a chunked JSON array
+STREAM_THRESHOLD = 1000
+
+# Items encoded per streamed chunk; bounds the memory held by one chunk
+STREAM_CHUNK_SIZE = 500
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that encodes with orjson, falling back to the stdlib for loads and unsupported types"""
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def dumps_bytes(self, obj):
+        # Dates and dataclasses go through default() so output matches the stdlib provider
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
+
+
+class StdlibProvider(DefaultJSONProvider):
+    """Flask's default provider with a bytes encoder matching OrjsonProvider"""
+
+    def dumps_bytes(self, obj):
+        return json.dumps(obj, default=self.default, sort_keys=self.sort_keys,
+                          separators=(',', ':'), ensure_ascii=self.ensure_ascii).encode('utf-8')
+
+
+def get_json_provider_class(name=None):
+    """Pick the JSON provider: 'orjson' or 'stdlib', defaulting to orjson when it is installed."""
+    if name == 'stdlib' or orjson is None:
+        return StdlibProvider
+    return OrjsonProvider
+
+
+def iter_json_list(app, result, key, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Encode a result dict whose `key` holds a long list as a series of chunks,
+    so only one chunk of the encoded array is in memory at a time.
+    """
+    provider = app.json
+    head = {name: value for name, value in result.items() if name != key}
+    prefix = provider.dumps_bytes(head)[:-1]
+    yield prefix + (b',' if head else b'') + provider.dumps_bytes(key) + b':['
+
+    items = result[key]
+    for start in range(0, len(items), chunk_size):
+        chunk = provider.dumps_bytes(items[start:start + chunk_size])[1:-1]
+        yield (b',' if start else b'') + chunk
+    yield b']}'
+
+
+def list_response(app, result, key, threshold=STREAM_THRESHOLD):
+    """Return result as JSON, streaming it as a chunked array when result[key] is long."""
+    if len(result.get(key) or ()) < threshold:
+        return app.json.response(result)
+    return Response(stream_with_context(iter_json_list(app, result, key)), mimetype='application/json')
@@ -0,0 +1,237 @@
+import time
+import bisect
+import threading
+
+from flask import Response, g, request
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow model calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    type = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+    type = 'gauge'
+
+    def inc(self, labels=(), amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+    def set(self, value, labels=()):
+        with self.lock:
+            self.values[labels] = value
+
+
+class CallbackGauge(_Metric):
+    """Gauge whose value is read from a callback at scrape time"""
+    type = 'gauge'
+
+    def __init__(self, name, help, callback):
+        super().__init__(name, help)
+        self.callback = callback
+
+    def render(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}',
+                f'{self.name} {_format_value(self.callback())}']
+
+
+class CallbackCounter(CallbackGauge):
+    """Counter whose running total is read from a callback at scrape time"""
+    type = 'counter'
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets"""
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, labels=()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                # Per-bucket counts (last slot is +Inf), then sum
+                state = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        with self.lock:
+            for labels, state in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), state):
+                    cumulative += count
+                    bucket_labels = _format_labels(self.labelnames, labels, f'le="{_format_value(bound)}"')
+                    lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+                label_text = _format_labels(self.labelnames, labels)
+                lines.append(f'{self.name}_sum{label_text} {_format_value(state[-1])}')
+                lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+
+class _Span:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered in the Prometheus text exposition format.
+
+    Every registry comes with a stage histogram used by span() to time the
+    expensive parts of a request (inference, storage, speech, ...).
+    """
+
+    def __init__(self, prefix='app'):
+        self.prefix = prefix
+        self.metrics = []
+        self.stage_duration = self.histogram(
+            'stage_duration_seconds', 'Time spent in each processing stage', ('stage',)
+        )
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(f'{self.prefix}_{name}', help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self._register(Gauge(f'{self.prefix}_{name}', help, labelnames))
+
+    def callback_gauge(self, name, help, callback):
+        return self._register(CallbackGauge(f'{self.prefix}_{name}', help, callback))
+
+    def callback_counter(self, name, help, callback):
+        return self._register(CallbackCounter(f'{self.prefix}_{name}', help, callback))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(f'{self.prefix}_{name}', help, labelnames, buckets))
+
+    def span(self, stage):
+        """Context manager timing a processing stage."""
+        return _Span(self.stage_duration, (stage,))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def instrument_app(app, registry, endpoint='/metrics'):
+    """
+    Record per-route latency, request and error counts and in-flight requests
+    for a Flask app, and serve the registry at the given endpoint.
+    """
+    latency = registry.histogram(
+        'request_duration_seconds', 'Request latency by route', ('method', 'route')
+    )
+    requests_total = registry.counter(
+        'requests_total', 'Requests by route and status', ('method', 'route', 'status')
+    )
+    errors_total = registry.counter(
+        'request_errors_total', 'Requests that ended in a 5xx response', ('method', 'route')
+    )
+    in_flight = registry.gauge('requests_in_flight', 'Requests currently being handled')
+
+    def record(status):
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        labels = (request.method, route)
+        latency.observe(time.perf_counter() - g.metrics_start, labels)
+        requests_total.inc(labels + (str(status),))
+        if status >= 500:
+            errors_total.inc(labels)
+        g.metrics_recorded = True
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_recorded = False
+        in_flight.inc()
+
+    @app.after_request
+    def record_request(response):
+        if 'metrics_start' in g:
+            record(response.status_code)
+        return response
+
+    @app.teardown_request
+    def finish_request(exc):
+        if 'metrics_start' not in g:
+            return
+        in_flight.dec()
+        # Unhandled exceptions skip after_request
+        if not g.metrics_recorded:
+            record(500)
+
+    @app.route(endpoint, methods=['GET'])
+    def metrics():
+        return Response(registry.render(), mimetype=None, content_type=CONTENT_TYPE)
+
+    return registry
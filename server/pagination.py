@@ -0,0 +1,95 @@
+import json
+import base64
+import bisect
+
+# Upper bound on the page size a client may ask for
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def encode_cursor(key):
+    """Turn a sort key into an opaque cursor string."""
+    raw = json.dumps(list(key), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Turn a cursor string back into the sort key it was made from."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursorError('Invalid cursor')
+    if not isinstance(key, list) or not all(isinstance(part, str) for part in key):
+        raise InvalidCursorError('Invalid cursor')
+    return tuple(key)
+
+
+def parse_limit(value):
+    """Clamp a requested page size to 1..MAX_PAGE_SIZE, or None for no limit."""
+    if value is None:
+        return None
+    return max(1, min(int(value), MAX_PAGE_SIZE))
+
+
+def parse_fields(value):
+    """Parse a comma separated fields= parameter into a tuple, or None for every field."""
+    if not value:
+        return None
+    fields = tuple(field.strip() for field in value.split(',') if field.strip())
+    return fields or None
+
+
+def project(record, fields):
+    """Copy only the requested fields of a record; the id is always kept."""
+    if fields is None:
+        return record
+    projected = {'id': record.get('id')}
+    for field in fields:
+        if field in record:
+            projected[field] = record[field]
+    return projected
+
+
+class SortedKeyIndex:
+    """
+    Sorted list of record sort keys supporting keyset pagination.
+
+    Pages are returned newest first (descending key order). Seeking to a
+    cursor is a binary search and a page only touches `limit` keys, so
+    fetching a page never walks the records before it.
+    """
+
+    def __init__(self):
+        self.keys = []
+
+    def add(self, key):
+        bisect.insort(self.keys, key)
+
+    def remove(self, key):
+        position = bisect.bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            del self.keys[position]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def page(self, limit=None, after=None):
+        """
+        Return (keys, next_key) for one page in descending order
+
+        Args:
+            limit: Page size, or None for everything after the cursor
+            after: Key of the last record on the previous page
+
+        Returns:
+            tuple: the page's keys and the key to continue after, or None on the last page
+        """
+        end = len(self.keys) if after is None else bisect.bisect_left(self.keys, after)
+        start = 0 if limit is None else max(0, end - limit)
+        keys = self.keys[start:end][::-1]
+        next_key = keys[-1] if start > 0 and keys else None
+        return keys, next_key
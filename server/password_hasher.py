@@ -0,0 +1,124 @@
+import base64
+import hashlib
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import bcrypt
+
+
+# bcrypt only uses the first 72 bytes of a password, and bcrypt 5 rejects anything longer
+BCRYPT_MAX_BYTES = 72
+
+
+def bcrypt_input(password):
+    """Password bytes for bcrypt; longer passwords are pre-hashed so every byte still counts."""
+    encoded = password.encode('utf-8')
+    if len(encoded) > BCRYPT_MAX_BYTES:
+        # base64 of the digest keeps NUL bytes out of bcrypt's input
+        encoded = base64.b64encode(hashlib.sha256(encoded).digest())
+    return encoded
+
+
+class HasherBusyError(Exception):
+    """Raised when a hashing request is rejected to protect the rest of the server"""
+
+
+class PasswordHasher:
+    """
+    bcrypt hashing and verification on a dedicated, bounded worker pool.
+
+    bcrypt is deliberately slow, so at most max_workers hashes run at once
+    (bcrypt releases the GIL while it works) and at most max_pending more may
+    wait for a worker; anything beyond that is rejected immediately instead
+    of tying up request threads. client_slot() additionally caps how many
+    hashing requests a single client may have in flight.
+    """
+
+    def __init__(self, rounds=12, max_workers=2, max_pending=32, per_client_limit=2, timeout=10.0):
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.per_client_limit = per_client_limit
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bcrypt')
+        self.capacity = threading.BoundedSemaphore(max_workers + max_pending)
+        self.clients = {}
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        # Verified against when a user does not exist so the response time does not reveal it
+        self.dummy_hash = bcrypt.hashpw(b'dummy-password', bcrypt.gensalt(rounds))
+
+    @contextmanager
+    def client_slot(self, client_key):
+        """Reserve one of the client's concurrent hashing slots, or raise HasherBusyError."""
+        with self.lock:
+            active = self.clients.get(client_key, 0)
+            if active >= self.per_client_limit:
+                self.rejected += 1
+                raise HasherBusyError('Too many concurrent authentication requests')
+            self.clients[client_key] = active + 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                remaining = self.clients[client_key] - 1
+                if remaining:
+                    self.clients[client_key] = remaining
+                else:
+                    del self.clients[client_key]
+
+    def _run(self, function, *args):
+        if not self.capacity.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            raise HasherBusyError('Authentication service is busy')
+
+        with self.lock:
+            self.submitted += 1
+
+        def task():
+            with self.lock:
+                self.started += 1
+            try:
+                return function(*args)
+            finally:
+                with self.lock:
+                    self.completed += 1
+                self.capacity.release()
+
+        try:
+            return self.executor.submit(task).result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # The work still finishes in the background and frees its slot; the caller is told to retry
+            with self.lock:
+                self.timed_out += 1
+            raise HasherBusyError('Authentication service is busy')
+
+    def hash(self, password):
+        """Hash a password; returns the bcrypt hash as a string."""
+        hashed = self._run(bcrypt.hashpw, bcrypt_input(password), bcrypt.gensalt(self.rounds))
+        return hashed.decode('utf-8')
+
+    def verify(self, password, hashed):
+        """Check a password against a stored hash (or a dummy hash when hashed is None)."""
+        stored = hashed.encode('utf-8') if hashed else self.dummy_hash
+        matches = self._run(bcrypt.checkpw, bcrypt_input(password), stored)
+        return matches and hashed is not None
+
+    def metrics(self):
+        """Snapshot of the pool's queue depth and counters."""
+        with self.lock:
+            return {
+                'workers': self.max_workers,
+                'queue_depth': self.submitted - self.started,
+                'in_flight': self.started - self.completed,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'active_clients': len(self.clients)
+            }
@@ -0,0 +1,133 @@
+import os
+import sys
+import hmac
+import time
+import random
+import threading
+
+from flask import Response, abort, g, request
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for selected request threads.
+
+    While at least one profiled request is running, a background thread wakes
+    every interval seconds, reads the current stack of each profiled thread
+    and counts it under that request's route. Stacks are kept in collapsed
+    form ("outer;inner;leaf count"), which flamegraph tools read directly.
+    Threads that are not being profiled pay nothing.
+    """
+
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.active = {}    # thread id -> route
+        self.stacks = {}    # route -> {collapsed stack: samples}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def begin(self, route):
+        """Start sampling the calling thread under the given route."""
+        with self.lock:
+            self.active[threading.get_ident()] = route
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._sample_thread, name='profiler')
+                self.thread.daemon = True
+                self.thread.start()
+        self.wakeup.set()
+
+    def end(self):
+        """Stop sampling the calling thread."""
+        with self.lock:
+            self.active.pop(threading.get_ident(), None)
+
+    def _collapse(self, frame):
+        labels = []
+        while frame is not None and len(labels) < self.max_depth:
+            labels.append(_frame_label(frame.f_code))
+            frame = frame.f_back
+        return ';'.join(reversed(labels))
+
+    def _sample_thread(self):
+        while True:
+            self.wakeup.wait()
+            with self.lock:
+                active = dict(self.active)
+                if not active:
+                    self.wakeup.clear()
+                    continue
+
+            frames = sys._current_frames()
+            samples = [(route, self._collapse(frames[thread_id]))
+                       for thread_id, route in active.items() if thread_id in frames]
+            del frames
+
+            with self.lock:
+                for route, stack in samples:
+                    counts = self.stacks.setdefault(route, {})
+                    counts[stack] = counts.get(stack, 0) + 1
+
+            time.sleep(self.interval)
+
+    def collapsed(self, route=None):
+        """Return collapsed stacks, one 'route;frames count' line each."""
+        with self.lock:
+            lines = []
+            for stack_route, counts in sorted(self.stacks.items()):
+                if route is not None and stack_route != route:
+                    continue
+                for stack, count in sorted(counts.items()):
+                    lines.append(f"{stack_route};{stack} {count}")
+        return '\n'.join(lines) + ('\n' if lines else '')
+
+    def reset(self):
+        """Discard collected samples."""
+        with self.lock:
+            self.stacks = {}
+
+
+def instrument_profiler(app, profiler, sample_rate=0.0, token=None, endpoint='/debug/profile'):
+    """
+    Profile a sampled fraction of requests (or those sending an X-Profile
+    header equal to the token) and serve their collapsed stacks from a
+    token-protected endpoint. With no sample rate and no token, nothing is
+    registered and requests pay no overhead.
+    """
+    if sample_rate <= 0 and not token:
+        return None
+
+    def has_token(header):
+        value = request.headers.get(header)
+        return bool(token and value and hmac.compare_digest(value, token))
+
+    @app.before_request
+    def start_profiling():
+        sampled = sample_rate > 0 and random.random() < sample_rate
+        if not sampled and not has_token('X-Profile'):
+            return
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        profiler.begin(route)
+        g.profiling = True
+
+    @app.teardown_request
+    def stop_profiling(exc):
+        if g.get('profiling'):
+            profiler.end()
+
+    @app.route(endpoint, methods=['GET'])
+    def profile_dump():
+        # Stack dumps reveal code structure, so they require the profile token
+        if not has_token('X-Profile-Token'):
+            abort(404)
+        body = profiler.collapsed(request.args.get('route'))
+        if request.args.get('reset') == 'true':
+            profiler.reset()
+        return Response(body, mimetype='text/plain')
+
+    return profiler
@@ -0,0 +1,174 @@
+import json
+import bisect
+import hashlib
+import threading
+
+from journal_search import tokenize
+from pagination import encode_cursor, project
+
+
+# Resources the catalog starts with; also used to pre-render chat replies that suggest them
+SAMPLE_RESOURCES = [
+    {
+        'id': '1',
+        'title': 'Understanding Anxiety',
+        'description': 'Learn about the causes and symptoms of anxiety disorders.',
+        'url': 'https://example.com/anxiety',
+        'type': 'article',
+        'featured': True
+    },
+    {
+        'id': '2',
+        'title': '10-Minute Meditation',
+        'description': 'A guided meditation for beginners.',
+        'url': 'https://example.com/meditation',
+        'type': 'meditation',
+        'featured': True
+    },
+    {
+        'id': '3',
+        'title': 'Stress Relief Techniques',
+        'description': 'Simple exercises to reduce stress.',
+        'url': 'https://example.com/stress-relief',
+        'type': 'exercise',
+        'featured': False
+    },
+    {
+        'id': '5',
+        'title': 'Crisis Hotline',
+        'description': '24/7 support for mental health crises',
+        'url': 'https://example.com/crisis',
+        'type': 'crisis',
+        'phone': '1-800-273-8255',
+        'featured': True
+    }
+]
+
+
+def _id_key(resource_id):
+    # Orders numeric ids numerically while still giving any string a stable place
+    return (len(resource_id), resource_id)
+
+
+class _CatalogSnapshot:
+    """Resources plus the secondary indexes built from them"""
+
+    def __init__(self, resources):
+        self.resources = resources
+        self.by_type = {}
+        self.featured = []
+        self.tokens = {}    # token -> set of positions in self.resources
+        self.by_id = {resource['id']: resource for resource in resources}
+        self.id_keys = sorted(_id_key(resource['id']) for resource in resources)
+
+        for position, resource in enumerate(resources):
+            self.by_type.setdefault(resource.get('type'), []).append(resource)
+            if resource.get('featured'):
+                self.featured.append(resource)
+            text = ' '.join(str(resource.get(field) or '') for field in ('title', 'description', 'type'))
+            for token in tokenize(text):
+                self.tokens.setdefault(token, set()).add(position)
+
+    def page(self, limit, after, fields):
+        start = 0 if after is None else bisect.bisect_right(self.id_keys, _id_key(after))
+        end = len(self.id_keys) if limit is None else start + limit
+        keys = self.id_keys[start:end]
+        return {
+            'resources': [project(self.by_id[resource_id], fields) for _, resource_id in keys],
+            'nextCursor': encode_cursor([keys[-1][1]]) if keys and end < len(self.id_keys) else None
+        }
+
+    def search(self, term):
+        positions = None
+        for token in tokenize(term):
+            matches = self.tokens.get(token, set())
+            positions = matches if positions is None else positions & matches
+            if not positions:
+                return []
+        return [self.resources[position] for position in sorted(positions or ())]
+
+
+class ResourceCatalog:
+    """
+    Read-side cache of the resource list.
+
+    The catalog is rebuilt lazily from the loader after invalidate() is called
+    by a resource write, and keeps indexes by type, by featured flag and by
+    search token. Each distinct query result is cached together with an ETag
+    derived from its content so clients can revalidate with If-None-Match.
+    """
+
+    def __init__(self, loader, max_results=1024):
+        self.loader = loader
+        self.max_results = max_results
+        self.snapshot = None
+        self.results = {}
+        self.lock = threading.Lock()
+
+    def invalidate(self):
+        """Drop the indexes and cached results after the resources changed."""
+        with self.lock:
+            self.snapshot = None
+            self.results = {}
+
+    def _query(self, key, select):
+        with self.lock:
+            cached = self.results.get(key)
+            if cached is not None:
+                return cached
+
+            if self.snapshot is None:
+                self.snapshot = _CatalogSnapshot([dict(resource) for resource in self.loader()])
+
+            resources = select(self.snapshot)
+            body = json.dumps(resources, sort_keys=True).encode('utf-8')
+            etag = hashlib.sha1(body).hexdigest()
+            if len(self.results) >= self.max_results:
+                self.results = {}
+            self.results[key] = (resources, etag)
+            return resources, etag
+
+    def all(self):
+        """Return (resources, etag) for every resource."""
+        return self._query(('all',), lambda snapshot: snapshot.resources)
+
+    def page(self, limit=None, after=None, fields=None):
+        """Return (page, etag) for one page of resources in id order, after the given id."""
+        return self._query(('page', limit, after, fields), lambda snapshot: snapshot.page(limit, after, fields))
+
+    def by_type(self, type):
+        """Return (resources, etag) for resources of one type."""
+        return self._query(('type', type), lambda snapshot: snapshot.by_type.get(type, []))
+
+    def featured(self):
+        """Return (resources, etag) for featured resources."""
+        return self._query(('featured',), lambda snapshot: snapshot.featured)
+
+    def search(self, term):
+        """Return (resources, etag) for resources matching every word of the term."""
+        key = ('search', ' '.join(tokenize(term)))
+        return self._query(key, lambda snapshot: snapshot.search(term))
+
+
+class PreparedResponse:
+    """
+    JSON response body serialized ahead of time.
+
+    The builder runs at construction and on every refresh(), never on the
+    request path; readers get the current (body, etag) pair with a single
+    attribute read, so a refresh never exposes a half-built payload.
+    """
+
+    def __init__(self, build):
+        self.build = build
+        self.payload = None
+        self.refresh()
+
+    def refresh(self):
+        """Rebuild the serialized body from current data."""
+        body = json.dumps(self.build(), separators=(',', ':')).encode('utf-8')
+        self.payload = (body, hashlib.sha1(body).hexdigest())
+
+    def get(self):
+        """Return the current (body, etag) pair."""
+        return self.payload
@@ -0,0 +1,184 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Reply templates per detected emotion, shared with the Node chat controller
+RESPONSE_TEMPLATES = {
+    'sadness': [
+        "I'm sorry to hear you're feeling down. Would you like to talk more about what's bothering you?",
+        "It sounds like you're going through a difficult time. Remember that it's okay to feel sad sometimes.",
+        "I hear that you're feeling sad. What's one small thing that might help you feel a little better right now?",
+        "When we feel sad, it's important to be gentle with ourselves. Is there someone supportive you could reach out to?"
+    ],
+    'joy': [
+        "It's wonderful to hear you're feeling positive! What's contributing to your good mood?",
+        "I'm glad you're feeling happy! Would you like to share more about what's going well?",
+        "That's great! Noticing and appreciating positive emotions can help us build resilience.",
+        "Your positive energy is wonderful. How can you carry this good feeling forward?"
+    ],
+    'love': [
+        "It sounds like you're experiencing feelings of connection and warmth, which is beautiful.",
+        "Those feelings of love and connection are so important for our wellbeing.",
+        "Having loving feelings is one of life's greatest gifts. Would you like to reflect more on this?",
+        "It's wonderful that you're experiencing such positive feelings of connection."
+    ],
+    'anger': [
+        "I can sense some frustration in your message. Would it help to talk more about what's bothering you?",
+        "It sounds like you're feeling angry, which is a normal reaction to difficult situations.",
+        "When we feel angry, it can be helpful to take a few deep breaths. Would you like to try a quick breathing exercise?",
+        "I hear that you're feeling frustrated. What do you think triggered these feelings?"
+    ],
+    'fear': [
+        "It sounds like you might be feeling anxious or worried. Would it help to explore these feelings?",
+        "Fear is our body's way of trying to protect us. What's causing you to feel this way?",
+        "When anxiety shows up, it can be helpful to ground ourselves. Would you like to try a grounding exercise?",
+        "I hear that you're feeling nervous. Remember that it's okay to take things one step at a time."
+    ],
+    'surprise': [
+        "That seems unexpected! Would you like to talk more about what surprised you?",
+        "Unexpected events can sometimes throw us off balance. How are you processing this surprise?",
+        "I sense that something unexpected has happened. Would you like to share more about it?",
+        "Surprises can be both positive and challenging. How are you feeling about this unexpected situation?"
+    ],
+    'unknown': [
+        "Thank you for sharing. How are you feeling today?",
+        "I'm here to listen. Would you like to tell me more about what's on your mind?",
+        "I appreciate you reaching out. What would be most helpful for you right now?",
+        "I'm here to support you. Is there something specific you'd like to explore today?"
+    ]
+}
+
+# Resource types worth suggesting for each emotion, most relevant first
+RESOURCE_TYPES = {
+    'sadness': ('meditation', 'article', 'exercise'),
+    'anger': ('exercise', 'meditation'),
+    'fear': ('article', 'exercise', 'meditation'),
+}
+
+# Words that make a resource a closer match for an emotion
+RESOURCE_KEYWORDS = {
+    'sadness': ('sad', 'mood', 'depression', 'meditation'),
+    'anger': ('stress', 'anger', 'breathing', 'relief'),
+    'fear': ('anxiety', 'stress', 'worry', 'panic'),
+}
+
+# (minimum confidence, band) pairs, highest first
+CONFIDENCE_BANDS = ((0.7, 'high'), (0.4, 'medium'), (0.0, 'low'))
+
+LOW_CONFIDENCE_PREFIX = "I'm not completely sure I understood, so tell me if I got this wrong. "
+
+# Reply sent instead of a generated one when a message matches a crisis phrase
+CRISIS_RESPONSE_TEXT = (
+    "It sounds like you're going through something really painful, and you don't have to face it alone. "
+    "Please reach out to one of these crisis services right now - they're available 24/7 and want to help."
+)
+
+
+def confidence_band(confidence):
+    """Map a classifier probability to 'high', 'medium' or 'low'."""
+    for minimum, band in CONFIDENCE_BANDS:
+        if confidence >= minimum:
+            return band
+    return 'low'
+
+
+def _relevant_resources(emotion, resources, limit):
+    types = RESOURCE_TYPES.get(emotion)
+    if not types:
+        return []
+    keywords = RESOURCE_KEYWORDS.get(emotion, ())
+
+    def rank(resource):
+        text = f"{resource.get('title', '')} {resource.get('description', '')}".lower()
+        hits = sum(1 for keyword in keywords if keyword in text)
+        return (-hits, types.index(resource['type']), not resource.get('featured'), resource.get('id', ''))
+
+    matches = [resource for resource in resources if resource.get('type') in types]
+    return [
+        {field: resource[field] for field in ('id', 'title', 'url', 'type') if field in resource}
+        for resource in sorted(matches, key=rank)[:limit]
+    ]
+
+
+class CompiledResponse:
+    """Finished reply texts and suggested resources for one (emotion, band) pair"""
+    __slots__ = ('texts', 'resources')
+
+    def __init__(self, texts, resources):
+        self.texts = texts
+        self.resources = resources
+
+
+class ResponseEngine:
+    """
+    Builds chat replies from the detected emotion and confidence.
+
+    Every (emotion, confidence band) combination is compiled ahead of time
+    into final reply texts already joined with the resources worth
+    suggesting, so rendering is a dictionary lookup plus picking a variant.
+    The compiled table is tied to the resource catalog's ETag and rebuilt
+    the first time it is used after the resources change. If that rebuild
+    fails, the previous table is served until it succeeds.
+    """
+
+    def __init__(self, labels, catalog, templates=RESPONSE_TEMPLATES, max_resources=2):
+        self.labels = list(labels)
+        self.catalog = catalog
+        self.templates = templates
+        self.max_resources = max_resources
+        self.compiled = {}
+        self.etag = None
+        self.lock = threading.Lock()
+
+    def _compile(self, resources):
+        compiled = {}
+        for emotion in self.labels + ['unknown']:
+            templates = self.templates.get(emotion) or self.templates['unknown']
+            suggested = _relevant_resources(emotion, resources, self.max_resources)
+            suggestion = f" You might find \"{suggested[0]['title']}\" helpful." if suggested else ''
+
+            compiled[(emotion, 'high')] = CompiledResponse(
+                tuple(text + suggestion for text in templates), suggested)
+            compiled[(emotion, 'medium')] = CompiledResponse(tuple(templates), suggested)
+            # A shaky prediction gets a hedged reply and no suggestions built on it
+            compiled[(emotion, 'low')] = CompiledResponse(
+                tuple(LOW_CONFIDENCE_PREFIX + text for text in self.templates['unknown']), [])
+        return compiled
+
+    def _table(self):
+        # A failed rebuild keeps serving the last good table; it is retried on the next call
+        try:
+            resources, etag = self.catalog.all()
+            if etag != self.etag:
+                with self.lock:
+                    if etag != self.etag:
+                        self.compiled = self._compile(resources)
+                        self.etag = etag
+        except Exception as e:
+            if not self.compiled:
+                raise
+            logger.error(f"Cannot rebuild chat responses, using the previous ones: {e}")
+        return self.compiled
+
+    def render(self, emotion, confidence, variant=0):
+        """
+        Return the reply for a prediction
+
+        Args:
+            emotion: Detected emotion label (unrecognized labels get a generic reply)
+            confidence: Probability of the detected emotion
+            variant: Picks among the templates, e.g. the turn number so replies rotate
+
+        Returns:
+            tuple: (reply text, list of suggested resources)
+        """
+        table = self._table()
+        band = confidence_band(confidence)
+        compiled = table.get((emotion, band)) or table[('unknown', band)]
+        return compiled.texts[variant % len(compiled.texts)], compiled.resources
+
+    def phrases(self):
+        """Every distinct reply text the compiled table can produce, e.g. to pre-render speech."""
+        table = self._table()
+        return list(dict.fromkeys(text for compiled in table.values() for text in compiled.texts))
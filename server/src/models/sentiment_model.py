@@ -18,6 +18,7 @@ class SentimentModel:
         self.max_sequence_length = 50
         self.vocab_size = 5000
         self.labels = ['sadness', 'joy', 'love', 'anger', 'fear', 'surprise']
+        self.vader = None
         
     def preprocess_text(self, text):
         """Preprocess text for the model."""
@@ -226,15 +227,42 @@ class SentimentModel:
             ]
         }
     
+    def predict_batch(self, texts, batch_size=64):
+        """Predict sentiment for several texts with a single model call."""
+        if self.model is None:
+            raise ValueError("Model not loaded")
+
+        if not texts:
+            return []
+
+        # Preprocess all texts into one input matrix
+        input_data = np.array([self.preprocess_text(text) for text in texts])
+        predictions = self.model.predict(input_data, batch_size=batch_size, verbose=0)
+
+        results = []
+        for probabilities in predictions:
+            max_index = np.argmax(probabilities)
+            results.append({
+                "emotion": self.labels[max_index],
+                "probability": float(probabilities[max_index]),
+                "all_emotions": [
+                    {"emotion": label, "probability": float(prob)}
+                    for label, prob in zip(self.labels, probabilities)
+                ]
+            })
+        return results
+
     def analyze_sentiment_fallback(self, text):
         """Simple sentiment analysis as fallback."""
         try:
-            from nltk.sentiment.vader import SentimentIntensityAnalyzer
-            nltk.download('vader_lexicon', quiet=True)
+            # Create the VADER analyzer once; downloading and loading the lexicon is slow
+            if self.vader is None:
+                from nltk.sentiment.vader import SentimentIntensityAnalyzer
+                nltk.download('vader_lexicon', quiet=True)
+                self.vader = SentimentIntensityAnalyzer()
             
             # Use VADER for sentiment analysis
-            sid = SentimentIntensityAnalyzer()
-            scores = sid.polarity_scores(text)
+            scores = self.vader.polarity_scores(text)
             
             # Map VADER scores to our emotions
             compound = scores['compound']
@@ -99,11 +99,12 @@ router.post('/speech/synthesize', (req, res) => {
   // Forward request to Python API
   const pythonApiUrl = 'http://localhost:5000/api/speech/synthesize';
   
-  // Use fetch to forward the request
+  // Use fetch to forward the request; ask for the JSON/base64 form this proxy relays
   fetch(pythonApiUrl, {
     method: 'POST',
     headers: {
-      'Content-Type': 'application/json'
+      'Content-Type': 'application/json',
+      'Accept': 'application/json'
     },
     body: JSON.stringify(req.body)
   })
@@ -0,0 +1,140 @@
+import os
+import json
+import logging
+import threading
+
+import numpy as np
+import speech_recognition as sr
+
+logger = logging.getLogger(__name__)
+
+
+class ASRBackend:
+    """
+    Speech recognition engine behind a common interface.
+
+    load() does any expensive setup (loading models, warming up) and is
+    called once per process by get_backend(). recognize() takes an
+    sr.AudioData and returns the transcript, raising sr.UnknownValueError
+    when no speech was understood and sr.RequestError when the engine
+    itself failed, like the speech_recognition recognizers do.
+    """
+
+    name = None
+
+    def load(self):
+        pass
+
+    def recognize(self, audio, language='en-US'):
+        raise NotImplementedError
+
+
+class GoogleBackend(ASRBackend):
+    """Google Web Speech API; needs network access"""
+
+    name = 'google'
+
+    def __init__(self):
+        self.recognizer = sr.Recognizer()
+
+    def recognize(self, audio, language='en-US'):
+        return self.recognizer.recognize_google(audio, language=language)
+
+
+class VoskBackend(ASRBackend):
+    """
+    Offline recognition with a local Vosk model (pip install vosk).
+
+    The model directory comes from VOSK_MODEL_PATH. It is loaded once in
+    load(), unlike sr.Recognizer.recognize_vosk which reloads it per call.
+    The model's language is fixed, so the language argument is ignored.
+    """
+
+    name = 'vosk'
+    sample_rate = 16000
+
+    def __init__(self, model_path=None):
+        self.model_path = model_path or os.getenv('VOSK_MODEL_PATH', 'model')
+        self.model = None
+        self.recognizer_class = None
+
+    def load(self):
+        try:
+            import vosk
+        except ImportError:
+            raise RuntimeError("Vosk is not installed; install it with 'pip install vosk'")
+        if not os.path.isdir(self.model_path):
+            raise RuntimeError(f"Vosk model not found at {self.model_path}; set VOSK_MODEL_PATH")
+
+        vosk.SetLogLevel(-1)
+        self.model = vosk.Model(self.model_path)
+        self.recognizer_class = vosk.KaldiRecognizer
+        # Warm up so the first real request does not pay for lazy initialization
+        self.recognizer_class(self.model, self.sample_rate).AcceptWaveform(bytes(self.sample_rate // 10 * 2))
+
+    def recognize(self, audio, language='en-US'):
+        recognizer = self.recognizer_class(self.model, self.sample_rate)
+        try:
+            recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2))
+            text = json.loads(recognizer.FinalResult()).get('text', '')
+        except Exception as e:
+            raise sr.RequestError(f"Vosk recognition failed: {e}")
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class StubBackend(ASRBackend):
+    """
+    Deterministic offline backend for tests and demos.
+
+    Audio whose RMS level is below silence_rms is treated as no speech;
+    anything louder is "recognized" as the fixed transcript (ASR_STUB_TRANSCRIPT).
+    """
+
+    name = 'stub'
+
+    def __init__(self, transcript=None, silence_rms=100.0):
+        self.transcript = transcript or os.getenv('ASR_STUB_TRANSCRIPT', 'hello')
+        self.silence_rms = silence_rms
+
+    def recognize(self, audio, language='en-US'):
+        samples = np.frombuffer(audio.get_raw_data(convert_width=2), dtype='<i2').astype(np.float32)
+        if not samples.size or np.sqrt(np.mean(samples * samples)) < self.silence_rms:
+            raise sr.UnknownValueError()
+        return self.transcript
+
+
+BACKENDS = {
+    'google': GoogleBackend,
+    'vosk': VoskBackend,
+    'stub': StubBackend,
+}
+
+_loaded_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name=None):
+    """
+    Return the process-wide instance of a backend, loading it on first use
+
+    Args:
+        name: Backend name; defaults to the ASR_BACKEND environment variable, then 'google'
+
+    Raises:
+        ValueError: for an unknown backend name
+        RuntimeError: if the backend cannot be loaded (e.g. its model is missing)
+    """
+    name = name or os.getenv('ASR_BACKEND', 'google')
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown ASR backend '{name}'; choose from {', '.join(BACKENDS)}")
+
+    with _backends_lock:
+        backend = _loaded_backends.get(name)
+        if backend is None:
+            backend = BACKENDS[name]()
+            backend.load()
+            _loaded_backends[name] = backend
+            logger.info(f"Loaded '{name}' speech recognition backend")
+        return backend
@@ -1,14 +1,26 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
+import io
 import os
+import sys
 import base64
-import tempfile
 import wave
+import struct
 import json
 import logging
-from text_to_speech import TextToSpeech
+import numpy as np
+from text_to_speech import TextToSpeech, split_sentences
+from tts_cache import TTSCache, DEFAULT_CACHE_DIR, cache_key
+from tts_pool import TTSPool, SynthesisBusyError
+from asr_backends import get_backend
+from streaming_asr import StreamingRecognizer, StreamingSessions
+from vad import energy_mask, frame_rms, noise_floor
 import speech_recognition as sr
 
+# Shared request instrumentation lives next to the main API in server/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from metrics import MetricsRegistry, instrument_app
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -16,18 +28,186 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Initialize text-to-speech engine
-tts = TextToSpeech()
+# Per-route latency, request/error counts and stage timings, served at /metrics
+metrics = instrument_app(app, MetricsRegistry('speech'))
+
+# Engines, worker pool, audio cache and recognizer the routes use; created by init_services()
+tts = None
+tts_pool = None
+tts_cache = None
+asr = None
+
+def init_services():
+    """Create the speech engines, TTS worker pool, audio cache and recognition backend"""
+    global tts, tts_pool, tts_cache, asr
+    
+    # Initialize text-to-speech engine (status and voice selection; rendering happens in the pool)
+    tts = TextToSpeech()
+
+    # Worker processes that render audio concurrently, each with its own engine
+    tts_pool = TTSPool(
+        max_workers=int(os.getenv('TTS_WORKERS', 2)),
+        max_pending=int(os.getenv('TTS_MAX_PENDING', 16))
+    )
+    metrics.callback_gauge('tts_queue_depth', 'Synthesis requests waiting for a TTS worker',
+                           lambda: tts_pool.metrics()['queue_depth'])
+    metrics.callback_counter('tts_timeouts_total', 'Synthesis requests that timed out and recycled the TTS pool',
+                             lambda: tts_pool.metrics()['timeouts'])
+
+    # Synthesized audio is cached by content, so repeated replies skip pyttsx3
+    tts_cache = TTSCache(
+        os.getenv('TTS_CACHE_DIR', DEFAULT_CACHE_DIR),
+        max_bytes=int(os.getenv('TTS_CACHE_MAX_MB', 256)) * 1024 * 1024,
+        hot_max_bytes=int(os.getenv('TTS_CACHE_HOT_MB', 32)) * 1024 * 1024
+    )
+    metrics.callback_gauge('tts_cache_hits', 'Synthesis requests served from the audio cache so far',
+                           lambda: tts_cache.stats()['hits'])
+    metrics.callback_gauge('tts_cache_misses', 'Synthesis requests that had to be rendered so far',
+                           lambda: tts_cache.stats()['misses'])
+
+    # Initialize the speech recognition backend once (ASR_BACKEND=google, vosk or stub)
+    try:
+        asr = get_backend()
+    except Exception as e:
+        logger.error(f"Error loading speech recognition backend: {e}")
+        asr = None
+
+# TTS workers are spawned processes that re-import this script as __mp_main__;
+# they must not build services of their own (another pool, cache index scan, Vosk model)
+if __name__ != '__mp_main__':
+    init_services()
+
+# Audio is normalized to what recognizers work with before recognition
+RECOGNITION_SAMPLE_RATE = 16000
+VAD_FRAME_MS = 30
+SPEECH_PADDING_MS = 200
+bytes_saved_counter = metrics.counter('asr_preprocessing_bytes_saved', 'Audio bytes removed by preprocessing before recognition')
+seconds_saved_counter = metrics.counter('asr_preprocessing_seconds_saved', 'Seconds of audio trimmed by preprocessing before recognition')
+
+# Live recognition streams opened through /api/speech/stream
+recognition_streams = StreamingSessions(
+    ttl=int(os.getenv('ASR_STREAM_TTL', 60)),
+    max_sessions=int(os.getenv('ASR_MAX_STREAMS', 100))
+)
 
-# Initialize speech recognizer
-recognizer = sr.Recognizer()
+def decode_pcm(frames, sample_width):
+    """PCM frames of any WAV sample width as float32 samples on the 16-bit scale."""
+    if sample_width == 1:
+        return (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) * 256.0
+    if sample_width == 2:
+        return np.frombuffer(frames, dtype='<i2').astype(np.float32)
+    if sample_width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        values = np.where(values & 0x800000, values - 0x1000000, values)
+        return (values / 256.0).astype(np.float32)
+    if sample_width == 4:
+        return (np.frombuffer(frames, dtype='<i4') / 65536.0).astype(np.float32)
+    raise ValueError(f'Unsupported sample width: {sample_width}')
+
+def resample(samples, rate, target_rate):
+    """Resample by linear interpolation, low-pass filtering first when downsampling."""
+    if rate == target_rate or not len(samples):
+        return samples
+    if rate > target_rate:
+        # Moving average over one output sample period keeps most aliasing out
+        width = int(np.ceil(rate / target_rate))
+        samples = np.convolve(samples, np.full(width, 1.0 / width, dtype=np.float32), mode='same')
+    count = int(round(len(samples) * target_rate / rate))
+    positions = np.arange(count, dtype=np.float64) * (rate / target_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+def preprocess_wav(audio_data):
+    """
+    Normalize uploaded WAV audio for recognition
+    
+    Downmixes to mono, resamples to 16 kHz and trims leading and trailing
+    silence found by an energy VAD, keeping a little padding around speech.
+    
+    Returns:
+        tuple: (16-bit mono WAV bytes, or None if no speech was found, stats dict)
+    """
+    with wave.open(io.BytesIO(audio_data), 'rb') as wav_file:
+        params = wav_file.getparams()
+        frames = wav_file.readframes(params.nframes)
+    
+    samples = decode_pcm(frames, params.sampwidth)
+    if params.nchannels > 1:
+        samples = samples[:len(samples) - len(samples) % params.nchannels]
+        samples = samples.reshape(-1, params.nchannels).mean(axis=1)
+    samples = resample(samples, params.framerate, RECOGNITION_SAMPLE_RATE)
+    
+    frame_length = RECOGNITION_SAMPLE_RATE * VAD_FRAME_MS // 1000
+    levels = frame_rms(samples, frame_length)
+    speech_frames = np.flatnonzero(energy_mask(levels, noise_floor(levels)))
+    if len(speech_frames):
+        padding = RECOGNITION_SAMPLE_RATE * SPEECH_PADDING_MS // 1000
+        start = max(0, speech_frames[0] * frame_length - padding)
+        end = min(len(samples), (speech_frames[-1] + 1) * frame_length + padding)
+        samples = samples[start:end]
+    else:
+        samples = samples[:0]
+    
+    processed = io.BytesIO()
+    with wave.open(processed, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(RECOGNITION_SAMPLE_RATE)
+        wav_file.writeframes(np.clip(samples, -32768, 32767).astype('<i2').tobytes())
+    processed = processed.getvalue()
+    
+    original_seconds = params.nframes / params.framerate
+    processed_seconds = len(samples) / RECOGNITION_SAMPLE_RATE
+    stats = {
+        'originalBytes': len(audio_data),
+        'processedBytes': len(processed),
+        'bytesSaved': len(audio_data) - len(processed),
+        'originalSeconds': round(original_seconds, 3),
+        'processedSeconds': round(processed_seconds, 3),
+        'secondsSaved': round(original_seconds - processed_seconds, 3)
+    }
+    return (processed if len(samples) else None), stats
+
+def read_audio_upload():
+    """
+    Read the audio of a recognition request without copying it to disk
+
+    Accepts a raw audio body (Content-Type: audio/wav), a multipart upload
+    with an 'audio' file field, or the original JSON payload with base64
+    audio_data. The language comes from the JSON payload, the form or the
+    ?language= query parameter.
+
+    Returns:
+        tuple: (file-like object with the audio, language), or (None, None) if no audio was sent
+    """
+    language = request.args.get('language', 'en-US')
+
+    if request.mimetype.startswith('audio/'):
+        audio_data = request.get_data(cache=False)
+        return (io.BytesIO(audio_data) if audio_data else None), language
+
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('audio')
+        language = request.form.get('language', language)
+        if upload is None:
+            return None, None
+        return io.BytesIO(upload.read()), language
+
+    data = request.get_json(silent=True)
+    if not data or 'audio_data' not in data:
+        return None, None
+    return io.BytesIO(base64.b64decode(data['audio_data'])), data.get('language', language)
 
 @app.route('/api/speech/recognize', methods=['POST'])
 def recognize_speech():
     """
     API endpoint to recognize speech from audio data
     
-    Expected JSON payload:
+    Preferred: POST the WAV file itself, either as the raw body with
+    Content-Type: audio/wav (language in ?language=) or as multipart/form-data
+    with an 'audio' file field and an optional 'language' field.
+    
+    Also accepted for older clients, a JSON payload:
     {
         "audio_data": "base64-encoded audio data",
         "content_type": "audio/wav",  // Or other audio format
@@ -42,38 +222,54 @@ def recognize_speech():
     }
     """
     try:
-        # Get request data
-        data = request.get_json()
+        # Audio is kept in memory; sr.AudioFile reads file-like objects directly
+        audio_file, language = read_audio_upload()
         
-        if not data or 'audio_data' not in data:
+        if audio_file is None:
             return jsonify({
                 'success': False,
                 'error': 'Missing audio data'
             }), 400
         
-        # Get audio data and content type
-        audio_data_base64 = data.get('audio_data')
-        content_type = data.get('content_type', 'audio/wav')
-        language = data.get('language', 'en-US')
-        
-        # Decode base64 audio data
-        audio_data = base64.b64decode(audio_data_base64)
+        if asr is None:
+            return jsonify({
+                'success': False,
+                'error': 'Speech recognition is not available on this server'
+            }), 503
         
-        # Save audio data to a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_file:
-            temp_filename = temp_file.name
-            temp_file.write(audio_data)
+        # WAV uploads are downmixed, resampled and trimmed first; other formats go to the recognizer as they are
+        preprocessing = None
+        try:
+            with metrics.span('audio_preprocessing'):
+                processed, preprocessing = preprocess_wav(audio_file.getvalue())
+        except (wave.Error, EOFError, ValueError):
+            pass
+        else:
+            bytes_saved_counter.inc(amount=max(0, preprocessing['bytesSaved']))
+            seconds_saved_counter.inc(amount=max(0.0, preprocessing['secondsSaved']))
+            logger.info(f"Preprocessing saved {preprocessing['bytesSaved']} bytes and {preprocessing['secondsSaved']}s of audio")
+            if processed is None:
+                # Nothing but silence: no need to run the recognizer at all
+                return jsonify({
+                    'success': False,
+                    'error': 'Speech could not be understood',
+                    'preprocessing': preprocessing
+                }), 400
+            audio_file = io.BytesIO(processed)
         
         try:
-            # Load audio file and recognize speech
-            with sr.AudioFile(temp_filename) as source:
-                audio = recognizer.record(source)
-                transcript = recognizer.recognize_google(audio, language=language)
+            # Load audio and recognize speech
+            with sr.AudioFile(audio_file) as source, metrics.span('speech_recognition'):
+                audio = sr.Recognizer().record(source)
+                transcript = asr.recognize(audio, language=language)
                 
-                return jsonify({
+                result = {
                     'success': True,
                     'transcript': transcript
-                })
+                }
+                if preprocessing:
+                    result['preprocessing'] = preprocessing
+                return jsonify(result)
         except sr.UnknownValueError:
             return jsonify({
                 'success': False,
@@ -82,14 +278,8 @@ def recognize_speech():
         except sr.RequestError as e:
             return jsonify({
                 'success': False,
-                'error': f'Could not request results from Google Speech Recognition service: {e}'
+                'error': f'Could not request results from {asr.name} speech recognition: {e}'
             }), 500
-        finally:
-            # Clean up temporary file
-            try:
-                os.unlink(temp_filename)
-            except Exception as e:
-                logger.error(f"Error deleting temporary file: {e}")
     except Exception as e:
         logger.error(f"Error in speech recognition endpoint: {e}")
         return jsonify({
@@ -109,7 +299,8 @@ def synthesize_speech():
         "volume": 1.0  // Optional, volume from 0.0 to 1.0
     }
     
-    Returns:
+    Returns the WAV audio itself (Content-Type: audio/wav). Clients that
+    send Accept: application/json instead get the older JSON form:
     {
         "success": true/false,
         "audio_data": "base64-encoded audio data",
@@ -131,45 +322,221 @@ def synthesize_speech():
         rate = data.get('rate', 175)
         volume = data.get('volume', 1.0)
         
-        # Set rate and volume
-        tts.set_rate(rate)
-        tts.set_volume(volume)
+        if not tts.is_speech_supported:
+            return jsonify({
+                'success': False,
+                'error': 'Text-to-speech is not supported on this server'
+            }), 500
+        
+        # The cache key doubles as the ETag, so a client holding this rendering needs nothing rendered or read
+        key = cache_key(text, rate, volume, tts.voice_id)
+        
+        # Raw audio unless the client explicitly prefers JSON
+        if request.accept_mimetypes.best_match(['audio/wav', 'application/json'], default='audio/wav') == 'application/json':
+            with metrics.span('speech_synthesis'):
+                audio_data = tts_cache.get_or_render(key, lambda: tts_pool.synthesize(text, rate=rate, volume=volume))
+            response = jsonify({
+                'success': True,
+                'audio_data': base64.b64encode(audio_data).decode('utf-8'),
+                'content_type': 'audio/wav'
+            })
+            response.set_etag(f"{key}-json")
+            return response
+        
+        if key in request.if_none_match:
+            response = Response(status=304)
+        else:
+            with metrics.span('speech_synthesis'):
+                audio_data = tts_cache.get_or_render(key, lambda: tts_pool.synthesize(text, rate=rate, volume=volume))
+            response = Response(audio_data, mimetype='audio/wav')
+        response.set_etag(key)
+        return response
+    except SynthesisBusyError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 429, {'Retry-After': '1'}
+    except Exception as e:
+        logger.error(f"Error in speech synthesis endpoint: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/speech/stream', methods=['POST'])
+def open_recognition_stream():
+    """
+    API endpoint to start streaming recognition
+    
+    Optional JSON payload:
+    {
+        "sample_rate": 16000,  // Sample rate of the audio that will be sent
+        "language": "en-US"
+    }
+    
+    Then POST chunks of raw 16-bit little-endian mono PCM to
+    /api/speech/stream/<streamId> as they are captured; each response lists
+    the partial and final transcripts produced so far. DELETE the stream to
+    flush the last utterance. Reusing one keep-alive connection for the
+    chunks avoids a new connection per chunk.
+    
+    Returns:
+    {
+        "success": true/false,
+        "streamId": "id to send audio to",
+        "error": "error message if any"
+    }
+    """
+    if asr is None:
+        return jsonify({
+            'success': False,
+            'error': 'Speech recognition is not available on this server'
+        }), 503
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        sample_rate = int(data.get('sample_rate', 16000))
+    except (TypeError, ValueError):
+        sample_rate = 0
+    if not 8000 <= sample_rate <= 48000:
+        return jsonify({
+            'success': False,
+            'error': 'sample_rate must be between 8000 and 48000'
+        }), 400
+    
+    stream_id = recognition_streams.create(
+        StreamingRecognizer(asr, sample_rate=sample_rate, language=data.get('language', 'en-US'))
+    )
+    if stream_id is None:
+        return jsonify({
+            'success': False,
+            'error': 'Too many open recognition streams'
+        }), 429, {'Retry-After': '1'}
+    
+    return jsonify({
+        'success': True,
+        'streamId': stream_id
+    })
+
+@app.route('/api/speech/stream/<stream_id>', methods=['POST', 'DELETE'])
+def recognition_stream(stream_id):
+    """
+    API endpoint to send audio to a recognition stream (POST) or close it (DELETE)
+    
+    Returns:
+    {
+        "success": true/false,
+        "events": [{"type": "partial" or "final", "text": "...", "start": 0.0, "end": 1.2}],
+        "error": "error message if any"
+    }
+    """
+    try:
+        if request.method == 'DELETE':
+            with metrics.span('speech_recognition'):
+                events = recognition_streams.run(stream_id, lambda stream: stream.finish(), close=True)
+        else:
+            chunk = request.get_data(cache=False)
+            with metrics.span('speech_recognition'):
+                events = recognition_streams.run(stream_id, lambda stream: stream.feed(chunk))
+        
+        if events is None:
+            return jsonify({
+                'success': False,
+                'error': 'Unknown or expired stream'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'events': events
+        })
+    except sr.RequestError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Could not request results from {asr.name} speech recognition: {e}'
+        }), 500
+    except Exception as e:
+        logger.error(f"Error in streaming recognition endpoint: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def read_wav(audio_data):
+    """Split WAV file bytes into its format parameters and raw PCM frames."""
+    with wave.open(io.BytesIO(audio_data), 'rb') as wav_file:
+        return wav_file.getparams(), wav_file.readframes(wav_file.getnframes())
+
+def streaming_wav_header(params):
+    """WAV header for audio of unknown length; the size fields hold the maximum, as players expect for streams."""
+    block_align = params.nchannels * params.sampwidth
+    return b''.join([
+        b'RIFF', struct.pack('<I', 0xFFFFFFFF), b'WAVE',
+        b'fmt ', struct.pack('<IHHIIHH', 16, 1, params.nchannels, params.framerate,
+                             params.framerate * block_align, block_align, params.sampwidth * 8),
+        b'data', struct.pack('<I', 0xFFFFFFFF)
+    ])
+
+@app.route('/api/speech/synthesize/stream', methods=['POST'])
+def synthesize_speech_stream():
+    """
+    API endpoint to synthesize speech sentence by sentence
+    
+    Takes the same JSON payload as /api/speech/synthesize. Responds with a
+    single audio/wav stream whose audio for each sentence is sent as soon
+    as it is rendered, so playback can start after the first sentence
+    instead of after the whole text. Sentences are cached individually.
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or 'text' not in data:
+            return jsonify({
+                'success': False,
+                'error': 'Missing text to synthesize'
+            }), 400
         
-        # Create a temporary file to store the audio
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_file:
-            temp_filename = temp_file.name
+        rate = data.get('rate', 175)
+        volume = data.get('volume', 1.0)
+        sentences = split_sentences(data.get('text') or '')
+        
+        if not sentences:
+            return jsonify({
+                'success': False,
+                'error': 'Missing text to synthesize'
+            }), 400
         
-        # Save audio to the temporary file
         if not tts.is_speech_supported:
             return jsonify({
                 'success': False,
                 'error': 'Text-to-speech is not supported on this server'
             }), 500
         
-        try:
-            # Use pyttsx3 to generate speech
-            engine = tts.engine
-            engine.save_to_file(text, temp_filename)
-            engine.runAndWait()
-            
-            # Read the audio file and encode it as base64
-            with open(temp_filename, 'rb') as audio_file:
-                audio_data = audio_file.read()
-                audio_data_base64 = base64.b64encode(audio_data).decode('utf-8')
-                
-                return jsonify({
-                    'success': True,
-                    'audio_data': audio_data_base64,
-                    'content_type': 'audio/wav'
-                })
-        finally:
-            # Clean up temporary file
-            try:
-                os.unlink(temp_filename)
-            except Exception as e:
-                logger.error(f"Error deleting temporary file: {e}")
+        def render(sentence):
+            key = cache_key(sentence, rate, volume, tts.voice_id)
+            with metrics.span('speech_synthesis'):
+                return read_wav(tts_cache.get_or_render(key, lambda: tts_pool.synthesize(sentence, rate=rate, volume=volume)))
+        
+        # The first sentence is rendered before responding so errors still get a proper status code
+        params, frames = render(sentences[0])
+        
+        def generate():
+            yield streaming_wav_header(params)
+            yield frames
+            for sentence in sentences[1:]:
+                try:
+                    yield render(sentence)[1]
+                except Exception as e:
+                    logger.error(f"Error streaming synthesized speech: {e}")
+                    return
+        
+        return Response(generate(), mimetype='audio/wav', headers={'X-Sentence-Count': str(len(sentences))})
+    except SynthesisBusyError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 429, {'Retry-After': '1'}
     except Exception as e:
-        logger.error(f"Error in speech synthesis endpoint: {e}")
+        logger.error(f"Error in speech synthesis streaming endpoint: {e}")
         return jsonify({
             'success': False,
             'error': str(e)
@@ -191,11 +558,12 @@ def get_status():
         tts_supported = tts.is_speech_supported
         
         # Check if automatic speech recognition is supported
-        asr_supported = True  # We assume SpeechRecognition is available as we're importing it
+        asr_supported = asr is not None
         
         return jsonify({
             'tts_supported': tts_supported,
-            'asr_supported': asr_supported
+            'asr_supported': asr_supported,
+            'asr_backend': asr.name if asr else None
         })
     except Exception as e:
         logger.error(f"Error in status endpoint: {e}")
@@ -0,0 +1,160 @@
+import time
+import uuid
+import threading
+from collections import deque
+
+import speech_recognition as sr
+
+from vad import EnergyVAD, frame_rms, pcm_to_samples
+
+
+class StreamingRecognizer:
+    """
+    Incremental recognition of a live audio stream.
+
+    Audio arrives in arbitrary chunks of 16-bit mono PCM through feed(). It
+    is cut into frames and run through an EnergyVAD, which splits the
+    stream into utterances: an utterance starts at the first speech frame
+    (plus a short pre-roll) and ends after silence_ms of silence. While an
+    utterance is open the audio so far is re-recognized every partial_ms to
+    produce partial transcripts; when it closes it is recognized once more
+    for the final transcript. feed() and finish() return the events produced
+    by that call as dicts with type 'partial' or 'final', the text, and the
+    utterance start/end in seconds from the start of the stream.
+    """
+
+    def __init__(self, backend, sample_rate=16000, language='en-US', frame_ms=30,
+                 silence_ms=600, partial_ms=1000, preroll_ms=150, max_utterance_ms=15000):
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self.language = language
+        self.frame_length = sample_rate * frame_ms // 1000
+        self.frame_bytes = self.frame_length * 2
+        self.silence_frames = max(1, silence_ms // frame_ms)
+        self.partial_frames = max(1, partial_ms // frame_ms)
+        self.max_frames = max(1, max_utterance_ms // frame_ms)
+        self.vad = EnergyVAD()
+
+        self.pending = b''
+        self.frames_seen = 0
+        self.preroll = deque(maxlen=max(1, preroll_ms // frame_ms))
+        self.utterance = None           # list of frame bytes while an utterance is open
+        self.utterance_start = 0
+        self.silent_run = 0
+        self.frames_since_partial = 0
+
+    def _seconds(self, frame_index):
+        return round(frame_index * self.frame_length / self.sample_rate, 3)
+
+    def _recognize(self, frames):
+        audio = sr.AudioData(b''.join(frames), self.sample_rate, 2)
+        try:
+            return self.backend.recognize(audio, language=self.language)
+        except sr.UnknownValueError:
+            return ''
+
+    def _close_utterance(self, events):
+        # Trailing silence is left out of what gets recognized
+        frames = self.utterance[:len(self.utterance) - self.silent_run] or self.utterance
+        text = self._recognize(frames)
+        if text:
+            events.append({
+                'type': 'final',
+                'text': text,
+                'start': self._seconds(self.utterance_start),
+                'end': self._seconds(self.utterance_start + len(frames))
+            })
+        self.utterance = None
+        self.silent_run = 0
+
+    def feed(self, pcm):
+        """Add a chunk of audio; returns the transcript events it produced."""
+        data = self.pending + pcm
+        usable = len(data) - len(data) % self.frame_bytes
+        self.pending = data[usable:]
+        if not usable:
+            return []
+
+        levels = frame_rms(pcm_to_samples(data[:usable]), self.frame_length)
+        speech = self.vad.classify(levels)
+
+        events = []
+        for index, is_speech in enumerate(speech):
+            frame = data[index * self.frame_bytes:(index + 1) * self.frame_bytes]
+            self.frames_seen += 1
+
+            if self.utterance is None:
+                if is_speech:
+                    self.utterance = list(self.preroll)
+                    self.utterance_start = self.frames_seen - len(self.utterance) - 1
+                    self.frames_since_partial = 0
+                    self.preroll.clear()
+                else:
+                    self.preroll.append(frame)
+                    continue
+
+            self.utterance.append(frame)
+            self.silent_run = 0 if is_speech else self.silent_run + 1
+            self.frames_since_partial += 1
+
+            if self.silent_run >= self.silence_frames or len(self.utterance) >= self.max_frames:
+                self._close_utterance(events)
+            elif self.frames_since_partial >= self.partial_frames and is_speech:
+                self.frames_since_partial = 0
+                text = self._recognize(self.utterance)
+                if text:
+                    events.append({
+                        'type': 'partial',
+                        'text': text,
+                        'start': self._seconds(self.utterance_start),
+                        'end': self._seconds(self.utterance_start + len(self.utterance))
+                    })
+        return events
+
+    def finish(self):
+        """End of stream: close any open utterance and return its final transcript."""
+        events = []
+        if self.utterance is not None:
+            self._close_utterance(events)
+        return events
+
+
+class StreamingSessions:
+    """Open recognition streams by id; streams idle for longer than ttl seconds are dropped."""
+
+    def __init__(self, ttl=60, max_sessions=100):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sessions = {}      # id -> [recognizer, lock, last used]
+        self.lock = threading.Lock()
+
+    def create(self, recognizer):
+        """Register a new stream; returns its id, or None if too many streams are open."""
+        now = time.monotonic()
+        with self.lock:
+            for session_id, (_, _, last_used) in list(self.sessions.items()):
+                if now - last_used > self.ttl:
+                    del self.sessions[session_id]
+            if len(self.sessions) >= self.max_sessions:
+                return None
+            session_id = uuid.uuid4().hex
+            self.sessions[session_id] = [recognizer, threading.Lock(), now]
+            return session_id
+
+    def run(self, session_id, action, close=False):
+        """
+        Call action(recognizer) for a stream, one call per stream at a time
+
+        Returns:
+            The action's result, or None if the stream does not exist
+        """
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return None
+            if close:
+                del self.sessions[session_id]
+            session[2] = time.monotonic()
+        recognizer, lock, _ = session
+        with lock:
+            return action(recognizer)
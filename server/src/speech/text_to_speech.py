@@ -3,20 +3,69 @@ import threading
 import logging
 import time
 import io
+import os
+import uuid
+import re
+import queue
+import itertools
+import tempfile
+from concurrent.futures import Future
 from contextlib import redirect_stdout, redirect_stderr
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# pyttsx3 can only render to a file; use RAM-backed /dev/shm when the system has it
+SYNTHESIS_DIR = os.getenv('TTS_SYNTHESIS_DIR') or ('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir())
+
+# Sentence boundaries: whitespace after end punctuation (optionally closed by a quote or bracket), or a line break
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?…])\s+|(?<=[.!?…]["”’)\]])\s+|\n\s*')
+
+# Playback states
+IDLE = 'idle'
+SPEAKING = 'speaking'
+PAUSED = 'paused'
+
+def split_sentences(text):
+    """Split text into sentences so it can be spoken or rendered one piece at a time."""
+    return [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(text) if sentence and sentence.strip()]
+
 class TextToSpeech:
-    """Python implementation of text-to-speech similar to the React TextToSpeech component"""
+    """
+    Python implementation of text-to-speech similar to the React TextToSpeech component
     
-    def __init__(self):
-        """Initialize the text-to-speech engine"""
+    A single worker thread owns the engine and consumes a queue of commands
+    (speak, pause, resume, stop, toggle, set_rate, set_volume, synthesize).
+    Control methods only enqueue a command, and cut the current utterance
+    short when the command needs it, so they return immediately and never
+    wait on the engine. Commands already queued are applied together before
+    the engine acts, so a burst of toggles settles on its final state.
+    Observe the state with get_status() or wait_for().
+    
+    Text is spoken one sentence at a time, so pause() followed by resume()
+    picks up at the sentence that was interrupted rather than starting over.
+    """
+    
+    def __init__(self, engine=None):
+        """Initialize the text-to-speech engine (or use the given pyttsx3-compatible engine)"""
+        self.state = IDLE
+        self.current_text = None
+        self.sentences = []
+        self.sentence_index = 0
+        self.current_id = 0
+        self.completed_id = 0
+        self.ids = itertools.count(1)
+        self.commands = queue.Queue()
+        self.interrupted = threading.Event()
+        self.state_changed = threading.Condition()
+        self.thread = None
+        self.running = True
+        self.send_lock = threading.Lock()   # orders commands against shutdown
+        
         try:
             # Redirect stdout/stderr to avoid pyttsx3 init messages
             with io.StringIO() as buf, redirect_stdout(buf), redirect_stderr(buf):
-                self.engine = pyttsx3.init()
+                self.engine = engine or pyttsx3.init()
             
             # Get available voices
             self.voices = self.engine.getProperty('voices')
@@ -28,21 +77,22 @@ class TextToSpeech:
             # Try to select a female voice if available
             self._select_voice()
             
-            self.is_speaking = False
-            self.is_paused = False
-            self.current_text = None
-            self.thread = None
-            self.lock = threading.Lock()
             self.is_speech_supported = True
             
+            self.thread = threading.Thread(target=self._worker_thread)
+            self.thread.daemon = True
+            self.thread.start()
+            
             logger.info("Text-to-speech engine initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing text-to-speech engine: {e}")
             self.is_speech_supported = False
             self.engine = None
+            self.voice_id = None
     
     def _select_voice(self):
         """Select a suitable voice for the engine"""
+        self.voice_id = None
         if not self.voices:
             logger.warning("No voices available")
             return
@@ -70,164 +120,273 @@ class TextToSpeech:
         # Set the voice (prioritize English female, then any female, then any English, then first voice)
         selected_voice = female_voice or english_voice or self.voices[0]
         self.engine.setProperty('voice', selected_voice.id)
+        self.voice_id = selected_voice.id
         logger.info(f"Selected voice: {selected_voice.name}")
     
+    
+    @property
+    def is_speaking(self):
+        return self.state != IDLE
+    
+    @property
+    def is_paused(self):
+        return self.state == PAUSED
+    
+    def _send(self, command, interrupt=False):
+        """Queue a command for the worker, cutting off the current utterance if asked"""
+        if not self.is_speech_supported:
+            return False
+        with self.send_lock:
+            # Nothing would ever consume a command queued after shutdown
+            if not self.running:
+                return False
+            self.commands.put(command)
+        if interrupt:
+            self.interrupted.set()
+            try:
+                self.engine.stop()
+            except Exception as e:
+                logger.error(f"Error interrupting speech: {e}")
+        return True
+    
     def speak(self, text, block=False):
         """
-        Speak the given text
+        Speak the given text, replacing anything currently being spoken
         
         Args:
             text: The text to speak
             block: Whether to block until speech is complete
         
         Returns:
-            bool: True if speech started successfully, False otherwise
+            bool: True if speech was queued successfully, False otherwise
         """
         if not self.is_speech_supported or not text or not text.strip():
             return False
         
-        with self.lock:
-            # Stop any current speech
-            self.stop()
-            
-            self.current_text = text
-            self.is_speaking = True
-            self.is_paused = False
-            
-            if block:
-                # Blocking mode - speak directly
-                try:
-                    self.engine.say(text)
-                    self.engine.runAndWait()
-                    self.is_speaking = False
-                    self.current_text = None
-                    return True
-                except Exception as e:
-                    logger.error(f"Error in text-to-speech: {e}")
-                    self.is_speaking = False
-                    self.current_text = None
-                    return False
-            else:
-                # Non-blocking mode - speak in a separate thread
-                self.thread = threading.Thread(target=self._speak_thread)
-                self.thread.daemon = True
-                self.thread.start()
-                return True
-    
-    def _speak_thread(self):
-        """Background thread for non-blocking speech"""
-        try:
-            self.engine.say(self.current_text)
-            self.engine.runAndWait()
-        except Exception as e:
-            logger.error(f"Error in text-to-speech thread: {e}")
-        finally:
-            with self.lock:
-                self.is_speaking = False
-                self.is_paused = False
+        utterance_id = next(self.ids)
+        if not self._send(('speak', text, utterance_id), interrupt=self.state == SPEAKING):
+            return False
+        if block:
+            with self.state_changed:
+                self.state_changed.wait_for(lambda: self.completed_id >= utterance_id)
+        return True
     
     def pause(self):
         """Pause the current speech"""
-        if not self.is_speech_supported or not self.is_speaking or self.is_paused:
-            return False
-        
-        with self.lock:
-            try:
-                self.engine.stop()
-                self.is_paused = True
-                logger.info("Speech paused")
-                return True
-            except Exception as e:
-                logger.error(f"Error pausing speech: {e}")
-                return False
+        return self._send(('pause',), interrupt=True)
     
     def resume(self):
         """Resume paused speech"""
-        if not self.is_speech_supported or not self.is_speaking or not self.is_paused:
-            return False
-        
-        with self.lock:
-            try:
-                # We have to re-say the text
-                if self.current_text:
-                    self.thread = threading.Thread(target=self._speak_thread)
-                    self.thread.daemon = True
-                    self.thread.start()
-                    
-                self.is_paused = False
-                logger.info("Speech resumed")
-                return True
-            except Exception as e:
-                logger.error(f"Error resuming speech: {e}")
-                return False
+        return self._send(('resume',))
     
     def stop(self):
         """Stop the current speech"""
-        if not self.is_speech_supported or not self.is_speaking:
-            return False
-        
-        with self.lock:
-            try:
-                self.engine.stop()
-                self.is_speaking = False
-                self.is_paused = False
-                logger.info("Speech stopped")
-                return True
-            except Exception as e:
-                logger.error(f"Error stopping speech: {e}")
-                return False
+        return self._send(('stop',), interrupt=True)
     
     def toggle(self):
         """Toggle between speaking, paused, and stopped states"""
-        with self.lock:
-            if not self.is_speaking:
-                # Not speaking, start if we have text
-                if self.current_text:
-                    return self.speak(self.current_text)
-                return False
-            elif self.is_paused:
-                # Paused, resume
-                return self.resume()
-            else:
-                # Speaking, pause
-                return self.pause()
+        return self._send(('toggle',), interrupt=self.state == SPEAKING)
     
     def set_rate(self, rate):
-        """Set the speech rate (words per minute)"""
-        if not self.is_speech_supported:
-            return False
+        """Set the speech rate (words per minute) for the next utterance"""
+        return self._send(('set_rate', rate))
+    
+    def set_volume(self, volume):
+        """Set the speech volume (0.0 to 1.0) for the next utterance"""
+        return self._send(('set_volume', max(0.0, min(1.0, volume))))
+    
+    def shutdown(self, timeout=5.0):
+        """Stop speaking and end the worker thread"""
+        if self._send(('quit',), interrupt=True):
+            self.thread.join(timeout)
+    
+    def wait_for(self, states, timeout=None):
+        """
+        Block until the engine is in one of the given states
         
-        with self.lock:
+        Returns:
+            bool: False if the timeout expired first
+        """
+        with self.state_changed:
+            return self.state_changed.wait_for(lambda: self.state in states, timeout)
+    
+    def _set_state(self, state, completed=False):
+        with self.state_changed:
+            self.state = state
+            if completed:
+                self.completed_id = self.current_id
+            self.state_changed.notify_all()
+    
+    def _apply(self, command):
+        """Update the state machine for one command; only the worker thread calls this"""
+        name = command[0]
+        if name == 'speak':
+            # Whatever was playing counts as finished once it is replaced
+            with self.state_changed:
+                self.completed_id = self.current_id
+                self.current_text, self.current_id = command[1], command[2]
+                self.sentences = split_sentences(command[1])
+                self.sentence_index = 0
+            self._set_state(SPEAKING)
+        elif name == 'pause':
+            if self.state == SPEAKING:
+                self._set_state(PAUSED)
+                logger.info("Speech paused")
+        elif name == 'resume':
+            if self.state == PAUSED:
+                self._set_state(SPEAKING)
+                logger.info("Speech resumed")
+        elif name == 'stop':
+            if self.state != IDLE:
+                self._set_state(IDLE, completed=True)
+                logger.info("Speech stopped")
+        elif name == 'toggle':
+            if self.state == SPEAKING:
+                self._set_state(PAUSED)
+            elif self.state == PAUSED:
+                self._set_state(SPEAKING)
+            elif self.current_text:
+                self._apply(('speak', self.current_text, next(self.ids)))
+        elif name == 'set_rate':
+            self.engine.setProperty('rate', command[1])
+            logger.info(f"Speech rate set to {command[1]}")
+        elif name == 'set_volume':
+            self.engine.setProperty('volume', command[1])
+            logger.info(f"Speech volume set to {command[1]}")
+        elif name == 'synthesize':
+            self._synthesize(*command[1:])
+        elif name == 'quit':
+            with self.send_lock:
+                self.running = False
+            if self.state != IDLE:
+                self._set_state(IDLE, completed=True)
+            self._discard_pending()
+    
+    def _settle(self, command, error):
+        """Release whoever waits on a command that will never run to completion"""
+        if command[0] == 'synthesize':
+            future = command[-1]
+            if not future.done():
+                future.set_exception(error)
+        elif command[0] == 'speak':
+            with self.state_changed:
+                self.completed_id = max(self.completed_id, command[2])
+                self.state_changed.notify_all()
+    
+    def _run(self, command):
+        """Apply one command; a failing command is settled and logged so the worker keeps going"""
+        try:
+            self._apply(command)
+        except Exception as e:
+            logger.error(f"Error applying text-to-speech command {command[0]}: {e}")
+            self._settle(command, e)
+    
+    def _discard_pending(self):
+        """Settle the commands left behind by quit so nobody waits on them forever"""
+        while True:
             try:
-                self.engine.setProperty('rate', rate)
-                logger.info(f"Speech rate set to {rate}")
-                return True
+                command = self.commands.get_nowait()
+            except queue.Empty:
+                return
+            self._settle(command, RuntimeError("Text-to-speech has been shut down"))
+    
+    def _drain(self):
+        """Apply every command already queued"""
+        while True:
+            try:
+                command = self.commands.get_nowait()
+            except queue.Empty:
+                return
+            self._run(command)
+    
+    def _worker_thread(self):
+        """Own the engine: apply queued commands, then speak the next sentence while the state says so"""
+        while self.running:
+            # Only wait for a command when there is nothing to speak
+            if self.state != SPEAKING:
+                self._run(self.commands.get())
+            self._drain()
+            
+            if self.state != SPEAKING:
+                continue
+            
+            self.interrupted.clear()
+            if not self.commands.empty():
+                continue
+            try:
+                self.engine.say(self.sentences[self.sentence_index])
+                self.engine.runAndWait()
             except Exception as e:
-                logger.error(f"Error setting speech rate: {e}")
-                return False
+                logger.error(f"Error in text-to-speech: {e}")
+            
+            # An interrupted sentence is settled by the command that interrupted it and spoken again on resume
+            if not self.interrupted.is_set():
+                with self.state_changed:
+                    self.sentence_index += 1
+                if self.sentence_index >= len(self.sentences):
+                    self._set_state(IDLE, completed=True)
     
-    def set_volume(self, volume):
-        """Set the speech volume (0.0 to 1.0)"""
+    def _synthesize(self, text, rate, volume, future):
+        path = os.path.join(SYNTHESIS_DIR, f"tts-{uuid.uuid4().hex}.wav")
+        previous_rate = self.engine.getProperty('rate')
+        previous_volume = self.engine.getProperty('volume')
+        try:
+            # Settings apply to this rendering only
+            if rate is not None:
+                self.engine.setProperty('rate', rate)
+            if volume is not None:
+                self.engine.setProperty('volume', max(0.0, min(1.0, volume)))
+            self.engine.save_to_file(text, path)
+            self.engine.runAndWait()
+            with open(path, 'rb') as audio_file:
+                audio_data = audio_file.read()
+        except Exception as e:
+            future.set_exception(e)
+            return
+        finally:
+            self.engine.setProperty('rate', previous_rate)
+            self.engine.setProperty('volume', previous_volume)
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        future.set_result(audio_data)
+    
+    def synthesize(self, text, rate=None, volume=None, timeout=30.0):
+        """
+        Render text to WAV audio without playing it
+        
+        Runs on the engine's worker thread, after any utterance being spoken.
+        
+        Args:
+            text: The text to render
+            rate: Optional speech rate for this rendering (words per minute)
+            volume: Optional volume for this rendering (0.0 to 1.0)
+            timeout: Seconds to wait for the audio before raising TimeoutError (None waits forever)
+        
+        Returns:
+            bytes: The WAV file contents
+        """
         if not self.is_speech_supported:
-            return False
+            raise RuntimeError("Text-to-speech is not supported")
         
-        with self.lock:
-            try:
-                self.engine.setProperty('volume', max(0.0, min(1.0, volume)))
-                logger.info(f"Speech volume set to {volume}")
-                return True
-            except Exception as e:
-                logger.error(f"Error setting speech volume: {e}")
-                return False
+        future = Future()
+        if not self._send(('synthesize', text, rate, volume, future)):
+            raise RuntimeError("Text-to-speech has been shut down")
+        return future.result(timeout)
     
     def get_status(self):
         """Get the current status of the text-to-speech engine"""
-        return {
-            'is_supported': self.is_speech_supported,
-            'is_speaking': self.is_speaking,
-            'is_paused': self.is_paused,
-            'current_text': self.current_text
-        }
+        with self.state_changed:
+            return {
+                'is_supported': self.is_speech_supported,
+                'state': self.state,
+                'is_speaking': self.state != IDLE,
+                'is_paused': self.state == PAUSED,
+                'current_text': self.current_text,
+                'sentence': self.sentence_index,
+                'sentences': len(self.sentences)
+            }
 
 # Example usage
 if __name__ == "__main__":
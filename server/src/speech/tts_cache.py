@@ -0,0 +1,240 @@
+import os
+import sys
+import hashlib
+import logging
+import argparse
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'tts_cache')
+
+
+def cache_key(text, rate, volume, voice_id):
+    """Content address of a rendering: the SHA-256 of everything that affects the audio."""
+    parts = (text, str(int(rate)), f"{float(volume):.2f}", voice_id or '')
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+
+class TTSCache:
+    """
+    Size-bounded LRU cache of synthesized audio.
+
+    Entries are stored on disk under their cache_key() and the most recently
+    used ones are also kept in memory, so a repeated reply is a dictionary
+    lookup and a cold one is a single file read. Both tiers evict least
+    recently used entries once their byte budget is exceeded. Files are
+    written atomically, so a crash never leaves a truncated entry behind.
+    Concurrent misses on the same key share a single render.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=256 * 1024 * 1024, hot_max_bytes=32 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hot_max_bytes = hot_max_bytes
+        self.entries = OrderedDict()    # key -> size of the file on disk, oldest first
+        self.disk_bytes = 0
+        self.hot = OrderedDict()        # key -> audio bytes, oldest first
+        self.hot_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.rendering = {}             # key -> Future of the render in progress
+        self.lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def _load_index(self):
+        """Rebuild the LRU order of files left by a previous run; reads touch the file's mtime."""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.wav'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            files.append((stat.st_mtime, name[:-4], stat.st_size))
+
+        for _, key, size in sorted(files):
+            self.entries[key] = size
+            self.disk_bytes += size
+        self._evict_disk()
+
+    def _evict_disk(self):
+        while self.disk_bytes > self.max_bytes and self.entries:
+            key, size = self.entries.popitem(last=False)
+            self.disk_bytes -= size
+            evicted = self.hot.pop(key, None)
+            if evicted is not None:
+                self.hot_bytes -= len(evicted)
+            try:
+                os.unlink(self._path(key))
+            except OSError as e:
+                logger.error(f"Error removing cached audio {key}: {e}")
+
+    def _remember(self, key, data):
+        if len(data) > self.hot_max_bytes:
+            return
+        previous = self.hot.pop(key, None)
+        if previous is not None:
+            self.hot_bytes -= len(previous)
+        self.hot[key] = data
+        self.hot_bytes += len(data)
+        while self.hot_bytes > self.hot_max_bytes:
+            _, evicted = self.hot.popitem(last=False)
+            self.hot_bytes -= len(evicted)
+
+    def get(self, key):
+        """Return the cached audio for a key, or None."""
+        with self.lock:
+            data = self.hot.get(key)
+            if data is not None:
+                self.hot.move_to_end(key)
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return data
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+
+        try:
+            with open(self._path(key), 'rb') as audio_file:
+                data = audio_file.read()
+            os.utime(self._path(key))
+        except OSError:
+            with self.lock:
+                size = self.entries.pop(key, None)
+                if size is not None:
+                    self.disk_bytes -= size
+                self.misses += 1
+            return None
+
+        with self.lock:
+            # The entry may have been evicted while the file was read; keep the hot tier a subset of the index
+            if key in self.entries:
+                self._remember(key, data)
+            self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """Store audio under a key."""
+        temp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as audio_file:
+            audio_file.write(data)
+        os.replace(temp_path, self._path(key))
+
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.disk_bytes -= previous
+            self.entries[key] = len(data)
+            self.disk_bytes += len(data)
+            self._remember(key, data)
+            self._evict_disk()
+
+    def get_or_render(self, key, render):
+        """
+        Return cached audio for a key, calling render() and storing its result on a miss
+
+        Only one render runs per key at a time; other callers missing on the
+        same key wait for it and get its result (or its exception).
+        """
+        while True:
+            data = self.get(key)
+            if data is not None:
+                return data
+            with self.lock:
+                # Stored between the miss and now: read it again rather than render twice
+                if key in self.entries:
+                    continue
+                future = self.rendering.get(key)
+                if future is None:
+                    future = self.rendering[key] = Future()
+                    break
+            return future.result()
+
+        try:
+            data = render()
+            self.put(key, data)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(data)
+        finally:
+            with self.lock:
+                self.rendering.pop(key, None)
+        return data
+
+    def stats(self):
+        """Entry counts, sizes and hit/miss totals."""
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'disk_bytes': self.disk_bytes,
+                'hot_entries': len(self.hot),
+                'hot_bytes': self.hot_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+def known_phrases():
+    """Companion replies worth pre-rendering: the crisis reply and every compiled chat reply."""
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+    from emotion_tagger import EMOTION_LABELS
+    from resource_catalog import ResourceCatalog, SAMPLE_RESOURCES
+    from response_engine import ResponseEngine, CRISIS_RESPONSE_TEXT
+
+    # Built like the chat controller's engine, so replies carry the same resource suggestions
+    engine = ResponseEngine(EMOTION_LABELS, ResourceCatalog(lambda: SAMPLE_RESOURCES))
+    return [CRISIS_RESPONSE_TEXT] + engine.phrases()
+
+
+def warm(cache, tts, phrases, rate=175, volume=1.0):
+    """Render every phrase that is not cached yet; returns the number rendered."""
+    rendered = 0
+    for phrase in phrases:
+        key = cache_key(phrase, rate, volume, tts.voice_id)
+        if cache.get(key) is None:
+            cache.put(key, tts.synthesize(phrase, rate=rate, volume=volume))
+            rendered += 1
+    return rendered
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-render common companion replies into the TTS cache')
+    parser.add_argument('--phrases', default=None, help='Text file with one extra phrase per line')
+    parser.add_argument('--no_templates', action='store_true', help='Skip the built-in chat response templates')
+    parser.add_argument('--cache_dir', default=os.getenv('TTS_CACHE_DIR', DEFAULT_CACHE_DIR), help='Cache directory')
+    parser.add_argument('--rate', type=int, default=175, help='Speech rate to render at')
+    parser.add_argument('--volume', type=float, default=1.0, help='Volume to render at')
+
+    args = parser.parse_args()
+
+    phrases = [] if args.no_templates else known_phrases()
+    if args.phrases:
+        with open(args.phrases, 'r', encoding='utf-8') as f:
+            phrases.extend(line.strip() for line in f if line.strip())
+
+    from text_to_speech import TextToSpeech
+    tts = TextToSpeech()
+    if not tts.is_speech_supported:
+        print("Text-to-speech is not supported on this machine. Exiting.")
+        return
+
+    cache = TTSCache(args.cache_dir, max_bytes=int(os.getenv('TTS_CACHE_MAX_MB', 256)) * 1024 * 1024)
+    rendered = warm(cache, tts, phrases, rate=args.rate, volume=args.volume)
+    print(f"Rendered {rendered} of {len(phrases)} phrases; cache holds {cache.stats()['entries']} entries")
+
+
+if __name__ == "__main__":
+    main()
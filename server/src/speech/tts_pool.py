@@ -0,0 +1,148 @@
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+# The TextToSpeech engine owned by this worker process
+_worker_tts = None
+
+
+class SynthesisBusyError(Exception):
+    """Raised when a synthesis request is rejected because every worker is busy and the queue is full"""
+
+
+class _Slot:
+    """One request's share of the pool capacity, released exactly once"""
+    __slots__ = ('released',)
+
+    def __init__(self):
+        self.released = False
+
+
+def _init_worker(engine_factory):
+    global _worker_tts
+    from text_to_speech import TextToSpeech
+    _worker_tts = TextToSpeech(engine=engine_factory() if engine_factory else None)
+
+
+def _synthesize(text, rate, volume):
+    # Rate and volume are set on every call, so one request's settings never leak into the next
+    return _worker_tts.synthesize(text, rate=rate, volume=volume)
+
+
+class TTSPool:
+    """
+    Pool of worker processes, each owning one TextToSpeech engine.
+
+    pyttsx3 hands out a single shared engine per process, so engines can
+    only run side by side in separate processes. Requests are queued to the
+    workers with their own rate and volume; at most max_workers renderings
+    run at once and at most max_pending more may wait, anything beyond that
+    raises SynthesisBusyError immediately. If a worker dies, the requests it
+    took down fail and the pool is replaced for the ones that follow. A
+    request that takes longer than timeout seconds is treated the same way:
+    its worker is presumed hung, so the pool's processes are terminated and
+    a new pool takes over.
+
+    engine_factory, if given, is a picklable callable returning the
+    pyttsx3-compatible engine each worker should use instead of its own.
+    """
+
+    def __init__(self, max_workers=2, max_pending=16, timeout=30.0, engine_factory=None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.engine_factory = engine_factory
+        self.executor = self._start_executor()
+        self.capacity = threading.BoundedSemaphore(max_workers + max_pending)
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.restarts = 0
+
+    def _start_executor(self):
+        # Spawned rather than forked: the parent already runs Flask and engine threads
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.engine_factory,)
+        )
+
+    def _restart(self, broken, reason='A TTS worker process died'):
+        """Replace a pool broken by a dead or hung worker, unless another request already did."""
+        with self.lock:
+            if self.executor is not broken:
+                return
+            self.executor = self._start_executor()
+            self.restarts += 1
+        logger.warning(f"{reason}; started a new pool")
+        # A hung worker never exits on its own; killing it fails whatever the old pool still held
+        processes = list((broken._processes or {}).values())
+        broken.shutdown(wait=False)
+        for process in processes:
+            process.terminate()
+
+    def _done(self, slot):
+        with self.lock:
+            if slot.released:
+                return
+            slot.released = True
+            self.completed += 1
+        self.capacity.release()
+
+    def synthesize(self, text, rate=175, volume=1.0):
+        """Render text to WAV bytes on one of the workers."""
+        if not self.capacity.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            raise SynthesisBusyError('Speech synthesis is busy')
+
+        slot = _Slot()
+        with self.lock:
+            self.submitted += 1
+            executor = self.executor
+        try:
+            future = executor.submit(_synthesize, text, rate, volume)
+        except Exception as e:
+            self._done(slot)
+            if isinstance(e, BrokenProcessPool):
+                self._restart(executor)
+            raise
+        future.add_done_callback(lambda _: self._done(slot))
+        try:
+            return future.result(timeout=self.timeout)
+        except BrokenProcessPool:
+            self._restart(executor)
+            raise
+        except FutureTimeoutError:
+            with self.lock:
+                self.timeouts += 1
+            self._done(slot)
+            self._restart(executor, f"A TTS request took longer than {self.timeout}s")
+            raise
+
+    def metrics(self):
+        """Snapshot of the pool's load and counters."""
+        with self.lock:
+            in_flight = self.submitted - self.completed
+            return {
+                'workers': self.max_workers,
+                'in_flight': min(in_flight, self.max_workers),
+                'queue_depth': max(0, in_flight - self.max_workers),
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'restarts': self.restarts
+            }
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        with self.lock:
+            executor = self.executor
+        executor.shutdown(wait=True)
@@ -0,0 +1,136 @@
+import numpy as np
+
+
+def pcm_to_samples(pcm):
+    """16-bit little-endian PCM bytes as a float32 array."""
+    return np.frombuffer(pcm, dtype='<i2').astype(np.float32)
+
+
+def frame_rms(samples, frame_length):
+    """RMS level of each complete frame of frame_length samples (a trailing partial frame is ignored)."""
+    count = len(samples) // frame_length
+    if not count:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[:count * frame_length].reshape(count, frame_length)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+def frame_zcr(samples, frame_length):
+    """Zero-crossing rate of each complete frame: the fraction of adjacent sample pairs that change sign."""
+    count = len(samples) // frame_length
+    if not count:
+        return np.zeros(0, dtype=np.float32)
+    frames = np.signbit(samples[:count * frame_length].reshape(count, frame_length))
+    return np.mean(frames[:, 1:] != frames[:, :-1], axis=1).astype(np.float32)
+
+
+def noise_floor(levels, edge_frames=10, percentile=10):
+    """
+    Background level of a whole recording from its frame RMS levels.
+
+    Takes the lower of a low percentile over every frame and the median of
+    the quieter edge (first or last edge_frames frames). A recording that is
+    mostly speech pushes the percentile onto speech, and one that starts or
+    ends mid-word does the same to that edge; both only land on speech when
+    there is no quiet background anywhere.
+    """
+    if not len(levels):
+        return 0.0
+    edge = min(len(levels), edge_frames)
+    quieter_edge = min(np.median(levels[:edge]), np.median(levels[-edge:]))
+    return float(min(np.percentile(levels, percentile), quieter_edge))
+
+
+def energy_mask(levels, floor, threshold_ratio=3.0, min_rms=150.0):
+    """Boolean array of the frames louder than threshold_ratio times floor (and at least min_rms)."""
+    return levels > max(min_rms, threshold_ratio * floor)
+
+
+class EnergyVAD:
+    """
+    Frame-level voice activity detection on RMS energy.
+
+    A frame counts as speech when its RMS is more than threshold_ratio times
+    the running noise floor (and at least min_rms). The noise floor follows
+    the level of non-speech frames, so the detector adapts to the background
+    noise of each recording or stream instead of using a fixed threshold.
+
+    The floor is carried from frame to frame, so this suits audio that
+    arrives incrementally. When the whole recording is at hand,
+    noise_floor() and energy_mask() classify it with array operations.
+    """
+
+    def __init__(self, threshold_ratio=3.0, min_rms=150.0, adaptation=0.05):
+        self.threshold_ratio = threshold_ratio
+        self.min_rms = min_rms
+        self.adaptation = adaptation
+        self.noise_floor = None
+
+    def is_speech(self, rms):
+        """Classify one frame by its RMS and update the noise floor."""
+        if self.noise_floor is None:
+            self.noise_floor = min(rms, self.min_rms)
+        speech = rms > max(self.min_rms, self.noise_floor * self.threshold_ratio)
+        if not speech:
+            self.noise_floor += self.adaptation * (rms - self.noise_floor)
+        return speech
+
+    def classify(self, levels):
+        """Classify a sequence of frame RMS levels; returns a boolean array."""
+        return np.fromiter((self.is_speech(float(rms)) for rms in levels), dtype=bool, count=len(levels))
+
+
+class SpeechGate:
+    """
+    Decides whether a captured segment of audio is worth recognizing.
+
+    The segment is cut into frames and each frame is scored on RMS energy
+    and zero-crossing rate. A frame is speech-like when it is louder than
+    threshold_ratio times the background level and its zero-crossing rate
+    is below max_zcr: voiced speech crosses zero far less often than hiss
+    or static, which can be just as loud. The background level is estimated
+    for each segment with noise_floor(), which leans on the segment's edges:
+    recognizer.listen() keeps a quiet lead-in before every phrase, so a long
+    phrase that is nearly all speech (or cut off by phrase_time_limit) is
+    still measured against the room, while a steady hum or fan that fills
+    the whole segment raises its own threshold. Segments with at least
+    min_speech_ms of speech-like frames pass.
+    """
+
+    def __init__(self, threshold_ratio=3.0, min_rms=150.0, max_zcr=0.3, min_speech_ms=150,
+                 frame_ms=30, edge_ms=300, noise_percentile=10):
+        self.threshold_ratio = threshold_ratio
+        self.min_rms = min_rms
+        self.max_zcr = max_zcr
+        self.min_speech_ms = min_speech_ms
+        self.frame_ms = frame_ms
+        self.edge_frames = max(1, edge_ms // frame_ms)
+        self.noise_percentile = noise_percentile
+        self.noise_floor = None     # background level of the last segment
+        self.accepted = 0
+        self.rejected = 0
+
+    def speech_frames(self, samples, sample_rate):
+        """Boolean array marking the speech-like frames of a segment."""
+        frame_length = max(1, sample_rate * self.frame_ms // 1000)
+        levels = frame_rms(samples, frame_length)
+        if not len(levels):
+            return np.zeros(0, dtype=bool)
+
+        self.noise_floor = noise_floor(levels, self.edge_frames, self.noise_percentile)
+        loud = energy_mask(levels, self.noise_floor, self.threshold_ratio, self.min_rms)
+        return loud & (frame_zcr(samples, frame_length) < self.max_zcr)
+
+    def accepts_pcm(self, pcm, sample_rate):
+        """Whether 16-bit mono PCM audio likely contains speech."""
+        speech = self.speech_frames(pcm_to_samples(pcm), sample_rate)
+        passed = bool(np.count_nonzero(speech) * self.frame_ms >= self.min_speech_ms)
+        if passed:
+            self.accepted += 1
+        else:
+            self.rejected += 1
+        return passed
+
+    def accepts(self, audio):
+        """Whether an sr.AudioData segment likely contains speech."""
+        return self.accepts_pcm(audio.get_raw_data(convert_width=2), audio.sample_rate)
@@ -2,6 +2,8 @@ import speech_recognition as sr
 import threading
 import time
 import logging
+from asr_backends import get_backend
+from vad import SpeechGate
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -9,15 +11,19 @@ logger = logging.getLogger(__name__)
 class VoiceRecognizer:
     """Python implementation of voice input similar to the React VoiceInput component"""
     
-    def __init__(self, callback=None, language='en-US'):
+    def __init__(self, callback=None, language='en-US', backend=None, gate=None):
         """
         Initialize the voice recognizer
         
         Args:
             callback: Function to call when a transcript is ready
             language: Language code for speech recognition
+            backend: ASR backend instance or name (defaults to the ASR_BACKEND setting)
+            gate: SpeechGate that screens captured phrases before recognition
         """
         self.recognizer = sr.Recognizer()
+        self.backend = get_backend(backend) if backend is None or isinstance(backend, str) else backend
+        self.gate = gate or SpeechGate()
         self.callback = callback
         self.language = language
         self.is_listening = False
@@ -90,8 +96,13 @@ class VoiceRecognizer:
                         # Listen for audio with a timeout
                         audio = self.recognizer.listen(source, timeout=1, phrase_time_limit=10)
                         
+                        # Noise that tripped the energy threshold is dropped without a recognition call
+                        if not self.gate.accepts(audio):
+                            logger.debug("Skipped a phrase without speech")
+                            continue
+                        
                         # Convert speech to text
-                        text = self.recognizer.recognize_google(audio, language=self.language)
+                        text = self.backend.recognize(audio, language=self.language)
                         self.transcript = text
                         
                         logger.info(f"Recognized: {text}")
@@ -0,0 +1,9 @@
+import os
+import sys
+
+SERVER_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The server and speech modules are imported as top-level modules, as the apps do
+for path in (SERVER_PATH, os.path.join(SERVER_PATH, 'src', 'speech')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
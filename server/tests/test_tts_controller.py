@@ -0,0 +1,119 @@
+import random
+import threading
+
+import pytest
+
+from benchmark import SimulatedEngine
+from text_to_speech import TextToSpeech, IDLE, SPEAKING
+
+TIMEOUT = 10.0
+TEXT = 'Breathe in slowly. Hold it for a moment. Now breathe out gently.'
+
+
+class FailingRateEngine(SimulatedEngine):
+    """Engine that rejects rates which are not numbers, like a real driver would"""
+
+    def setProperty(self, name, value):
+        if name == 'rate' and not isinstance(value, (int, float)):
+            raise TypeError(f"invalid rate: {value!r}")
+        super().setProperty(name, value)
+
+
+@pytest.fixture
+def tts():
+    tts = TextToSpeech(SimulatedEngine(speedup=20.0))
+    assert tts.is_speech_supported
+    yield tts
+    tts.shutdown()
+
+
+def run_threads(targets):
+    threads = [threading.Thread(target=target, daemon=True) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(TIMEOUT)
+    assert not any(thread.is_alive() for thread in threads), 'a control call hung'
+
+
+def test_concurrent_control_calls_settle(tts):
+    actions = [
+        lambda rng: tts.speak(TEXT),
+        lambda rng: tts.pause(),
+        lambda rng: tts.resume(),
+        lambda rng: tts.stop(),
+        lambda rng: tts.toggle(),
+        lambda rng: tts.set_rate(rng.randint(120, 220)),
+        lambda rng: tts.get_status(),
+    ]
+
+    def hammer(seed):
+        rng = random.Random(seed)
+        for _ in range(200):
+            rng.choice(actions)(rng)
+
+    run_threads([lambda seed=seed: hammer(seed) for seed in range(8)])
+
+    tts.stop()
+    assert tts.wait_for((IDLE,), timeout=TIMEOUT)
+    assert tts.thread.is_alive()
+
+
+def test_speak_blocks_until_finished(tts):
+    assert tts.speak(TEXT, block=True)
+    assert tts.get_status()['state'] == IDLE
+
+
+def test_stop_releases_blocking_speakers(tts):
+    slow = TextToSpeech(SimulatedEngine(speedup=0.5))
+    try:
+        run_threads([lambda: slow.speak(TEXT, block=True)] * 4 + [lambda: slow.wait_for((SPEAKING,), TIMEOUT) and slow.stop()])
+        assert slow.wait_for((IDLE,), timeout=TIMEOUT)
+    finally:
+        slow.shutdown()
+
+
+def test_shutdown_while_speaking_and_synthesizing():
+    tts = TextToSpeech(SimulatedEngine(speedup=0.5))
+    errors = []
+
+    def synthesize():
+        try:
+            tts.synthesize('Hello.', timeout=TIMEOUT)
+        except RuntimeError as e:
+            errors.append(e)
+
+    def shut_down():
+        tts.wait_for((SPEAKING,), TIMEOUT)
+        tts.shutdown(timeout=TIMEOUT)
+
+    run_threads([lambda: tts.speak(TEXT, block=True)] * 3 + [synthesize] * 3 + [shut_down])
+    assert not tts.thread.is_alive()
+    assert tts.get_status()['state'] == IDLE
+    assert not tts.speak(TEXT)
+    with pytest.raises(RuntimeError):
+        tts.synthesize(TEXT)
+
+
+def test_concurrent_synthesize_returns_each_callers_audio(tts):
+    results = {}
+
+    def synthesize(index):
+        results[index] = tts.synthesize(f"Phrase number {index}.", rate=150 + index, timeout=TIMEOUT)
+
+    run_threads([lambda index=index: synthesize(index) for index in range(10)] + [lambda: tts.speak(TEXT)])
+    assert results == {index: f"Phrase number {index}.".encode('utf-8') for index in range(10)}
+    assert tts.engine.getProperty('rate') == 175
+
+
+def test_failing_command_does_not_kill_worker():
+    tts = TextToSpeech(FailingRateEngine(speedup=20.0))
+    try:
+        tts.set_rate('abc')
+        with pytest.raises(TypeError):
+            tts.synthesize('Hello there.', rate='fast', timeout=TIMEOUT)
+        assert tts.synthesize('Hello there.', timeout=TIMEOUT) == b'Hello there.'
+        assert tts.speak(TEXT, block=True)
+        assert tts.thread.is_alive()
+    finally:
+        tts.shutdown()
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from vad import SpeechGate, EnergyVAD, energy_mask, frame_rms, frame_zcr, noise_floor, pcm_to_samples
+
+RATE = 16000
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+def seconds(duration):
+    return np.arange(int(duration * RATE)) / RATE
+
+
+def tone(duration, amplitude=8000):
+    """Voiced tone with a syllable-rate envelope"""
+    t = seconds(duration)
+    return amplitude * (0.7 + 0.3 * np.sin(2 * np.pi * 4 * t)) * (np.sin(2 * np.pi * 180 * t) + 0.5 * np.sin(2 * np.pi * 360 * t))
+
+
+def quiet(rng, duration):
+    return rng.normal(0, 30, int(duration * RATE))
+
+
+def pcm(signal):
+    return np.clip(signal, -32768, 32767).astype('<i2').tobytes()
+
+
+def phrase(rng, content, tail=0.8):
+    """A captured phrase as recognizer.listen returns it: quiet lead-in, content, quiet tail"""
+    return np.concatenate([quiet(rng, 0.5), content, quiet(rng, tail)])
+
+
+def test_pcm_round_trip():
+    samples = pcm_to_samples(pcm(np.array([0, 1000, -1000, 32767])))
+    assert samples.dtype == np.float32
+    assert samples.tolist() == [0, 1000, -1000, 32767]
+
+
+def test_frame_features():
+    t = seconds(0.1)
+    levels = frame_rms(1000 * np.sin(2 * np.pi * 200 * t), 160)
+    assert len(levels) == 10
+    assert levels == pytest.approx(1000 / np.sqrt(2), rel=0.01)
+
+    # 200 Hz crosses zero 400 times a second, white noise about every other sample
+    assert frame_zcr(np.sin(2 * np.pi * 200 * t + 0.1), 160) == pytest.approx(400 / RATE, abs=0.005)
+    assert frame_zcr(np.random.default_rng(0).normal(0, 1, 1600), 160).mean() == pytest.approx(0.5, abs=0.05)
+
+    assert len(frame_rms(np.zeros(100), 160)) == 0
+    assert len(frame_zcr(np.zeros(100), 160)) == 0
+
+
+def test_noise_floor_uses_quiet_background(rng):
+    levels = frame_rms(phrase(rng, tone(1.5)), 480)
+    assert noise_floor(levels) < 50
+
+    # Speech runs to the end of the segment; the quiet lead-in still sets the floor
+    levels = frame_rms(phrase(rng, tone(9.5), tail=0.0), 480)
+    assert noise_floor(levels) < 50
+
+    assert noise_floor(np.zeros(0)) == 0.0
+
+
+def test_energy_mask_thresholds():
+    levels = np.array([100.0, 200.0, 400.0, 1000.0])
+    assert energy_mask(levels, 50.0).tolist() == [False, True, True, True]
+    assert energy_mask(levels, 200.0).tolist() == [False, False, False, True]
+    assert energy_mask(levels, 10.0, min_rms=500.0).tolist() == [False, False, False, True]
+
+
+def test_energy_vad_adapts_to_background(rng):
+    vad = EnergyVAD()
+    background = np.abs(rng.normal(400, 20, 50))
+    assert not vad.classify(background).any()
+    assert vad.noise_floor == pytest.approx(400, rel=0.2)
+    assert vad.classify(np.array([3000.0]))[0]
+
+
+@pytest.mark.parametrize('make, expected', [
+    (lambda rng: phrase(rng, tone(1.5)), True),
+    (lambda rng: phrase(rng, tone(1.5, amplitude=2000)), True),
+    (lambda rng: phrase(rng, tone(6.0)), True),
+    (lambda rng: phrase(rng, tone(9.5), tail=0.0), True),
+    (lambda rng: phrase(rng, tone(1.5) + 400 * np.sin(2 * np.pi * 60 * seconds(1.5))), True),
+    (lambda rng: phrase(rng, quiet(rng, 1.5)), False),
+    (lambda rng: np.zeros(int(2.8 * RATE)), False),
+    (lambda rng: phrase(rng, rng.normal(0, 3000, int(1.5 * RATE))), False),
+    (lambda rng: phrase(rng, rng.uniform(-12000, 12000, int(1.5 * RATE))), False),
+    (lambda rng: 4000 * np.sin(2 * np.pi * 60 * seconds(2.8)), False),
+], ids=['tone', 'quiet tone', 'long tone', 'tone cut off', 'tone over hum',
+        'silence', 'digital silence', 'hiss', 'loud noise', 'hum'])
+def test_speech_gate(rng, make, expected):
+    gate = SpeechGate()
+    assert gate.accepts_pcm(pcm(make(rng)), RATE) is expected
+    assert (gate.accepted, gate.rejected) == ((1, 0) if expected else (0, 1))
+
+
+def test_speech_gate_rejects_short_bursts(rng):
+    gate = SpeechGate()
+    click = phrase(rng, quiet(rng, 1.5))
+    click[int(0.5 * RATE):int(0.54 * RATE)] = tone(0.04, amplitude=12000)
+    assert not gate.accepts_pcm(pcm(click), RATE)
+
+    # Just over min_speech_ms of tone passes
+    burst = phrase(rng, np.concatenate([tone(0.2), quiet(rng, 1.3)]))
+    assert gate.accepts_pcm(pcm(burst), RATE)
+
+
+def test_speech_gate_empty_segment():
+    gate = SpeechGate()
+    assert len(gate.speech_frames(np.zeros(10, dtype=np.float32), RATE)) == 0
+    assert not gate.accepts_pcm(b'', RATE)